@@ -0,0 +1,35 @@
+"""
+加载 anistrmnew 插件中不依赖 MoviePilot 的独立模块，便于脱离主程序运行基准测试
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parents[2] / "plugins" / "anistrmnew"
+
+
+def load(name: str):
+    """
+    按文件路径加载插件模块，如 load("records")
+    """
+    module_name = f"anistrmnew_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, PLUGIN_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_plugin():
+    """
+    加载完整插件类，需要在 MoviePilot 运行环境中执行（app 包可导入），
+    如：PYTHONPATH=/path/to/MoviePilot python benchmarks/anistrmnew/bench_task.py
+    """
+    plugins_dir = str(PLUGIN_DIR.parent)
+    if plugins_dir not in sys.path:
+        sys.path.insert(0, plugins_dir)
+    from anistrmnew import ANiStrmNew
+
+    return ANiStrmNew
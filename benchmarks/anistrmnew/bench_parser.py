@@ -0,0 +1,125 @@
+"""
+番剧名称解析吞吐对比：旧版逐次编译正则 vs 预编译 + LRU 缓存
+
+语料按 ANi 实际命名规则，由真实番剧名称、集数与标签组合生成，
+模拟定时任务每次运行重复解析同一批文件名
+
+用法：python benchmarks/anistrmnew/bench_parser.py [重复轮数]
+"""
+import re
+import sys
+import time
+
+from _plugin import load
+
+parser = load("parser")
+
+TITLES = [
+    "葬送的芙莉蓮",
+    "藥師少女的獨語",
+    "我獨自升級",
+    "【我推的孩子】",
+    "間諜家家酒",
+    "膽大黨",
+    "迷宮飯",
+    "鏈鋸人",
+    "咒術迴戰",
+    "鬼滅之刃 柱訓練篇",
+    "排球少年!!",
+    "BOCCHI THE ROCK！孤獨搖滾！",
+    "Re：從零開始的異世界生活 第三季",
+    "無職轉生 ～到了異世界就拿出真本事～ 第二季",
+    "關於我轉生變成史萊姆這檔事 第三季",
+    "為美好的世界獻上祝福！3",
+    "擅長捉弄的高木同學 3",
+    "輝夜姬想讓人告白 -超級浪漫-",
+    "香格里拉・開拓異境 ～糞作獵手挑戰神作～",
+    "勇氣爆發 Bang Bravern",
+    "戀愛中的小行星",
+    "死神 千年血戰篇-相剋譚-",
+    "東京復仇者 聖夜決戰篇",
+    "搖曳露營△ 第三季",
+    "魔法使的新娘 第二季",
+    "86－不存在的戰區－",
+    "小林家的龍女僕 S",
+    "青之驅魔師 島根啟明結社篇",
+    "敗北女角太多了！",
+    "亞爾斯的巨獸",
+    "GIRLS BAND CRY",
+    "Dr. STONE 新石紀 第三季",
+    "怪獸 8 號",
+    "夜晚的水母不會游泳",
+    "神之塔 -Tower of God- 王子的回歸",
+    "物語系列 Off & Monster Season",
+    "Fate／strange Fake",
+    "棄寶之島 ～遙與魔法鏡～",
+    "不時輕聲地以俄語遮羞的鄰座艾莉同學",
+    "義妹生活",
+]
+
+VARIANTS = [
+    "[1080P][Baha][WEB-DL][AAC AVC][CHT]",
+    "[1080P][Bilibili][WEB-DL][AAC AVC][CHT]",
+    "[720P][Baha][WEB-DL][AAC AVC][CHT]",
+]
+
+
+def corpus():
+    names = []
+    for title in TITLES:
+        for episode in range(1, 25):
+            for variant in VARIANTS:
+                names.append(f"[ANi] {title} - {episode:02d} {variant}.mp4")
+        names.append(f"[ANi] {title} - 12.5 {VARIANTS[0]}.mp4")
+        names.append(f"[ANi] {title} - 01v2 {VARIANTS[0]}.mp4")
+    return names
+
+
+def legacy_extract(file_name: str) -> str:
+    """
+    旧版实现，每次调用都导入并编译正则
+    """
+    import re
+
+    name = re.sub(r"^\[.*?\]\s*", "", file_name)
+    if " - " in name:
+        name = name.split(" - ")[0].strip()
+    name = re.sub(r"\[.*?\]", "", name).strip()
+    if not name:
+        name = file_name
+    return name
+
+
+def bench(label: str, func, names, rounds: int):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            func(name)
+    elapsed = time.perf_counter() - started
+    total = len(names) * rounds
+    print(f"{label:<28}{total / elapsed:>14,.0f} 个/秒  ({elapsed * 1000:.1f} ms)")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    names = corpus()
+    print(f"语料: {len(names)} 个文件名，重复 {rounds} 轮")
+
+    mismatches = [n for n in names if legacy_extract(n) != parser.extract_anime_name(n)]
+    if mismatches:
+        print(f"警告：{len(mismatches)} 个文件名解析结果与旧版不一致，如 {mismatches[0]}")
+
+    bench("旧版 re.sub", legacy_extract, names, rounds)
+    # 清除缓存后只跑一轮，衡量首次解析（含结构化字段）的开销
+    re.purge()
+    parser.parse_file_name.cache_clear()
+    bench("预编译（首轮，无缓存命中）", parser.parse_file_name, names, 1)
+    bench("预编译 + LRU 缓存", parser.parse_file_name, names, rounds)
+    print(f"缓存: {parser.parse_file_name.cache_info()}")
+
+    sample = parser.parse_file_name(names[0])
+    print(f"示例: {names[0]}\n  -> {sample}")
+
+
+if __name__ == "__main__":
+    main()
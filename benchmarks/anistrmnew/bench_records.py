@@ -0,0 +1,72 @@
+"""
+处理记录内存占用对比：旧版 dict 布局 vs ProcessedRecord
+
+用法：python benchmarks/anistrmnew/bench_records.py [记录数]
+"""
+import sys
+import tracemalloc
+from datetime import datetime
+
+from _plugin import load
+
+records = load("records")
+
+SEASONS = [f"{year}-{month}" for year in range(2019, 2027) for month in (1, 4, 7, 10)]
+BASE_URL = "https://openani.an-i.workers.dev"
+
+
+def synthetic_rows(count: int):
+    """
+    模拟全量库：每个季度约30部番剧，每部12集
+    """
+    for i in range(count):
+        season = SEASONS[(i // 360) % len(SEASONS)]
+        anime_name = f"番剧{season}-{(i // 12) % 30:02d}"
+        file_name = (
+            f"[ANi] {anime_name} - {i % 12 + 1:02d} "
+            "[1080P][Baha][WEB-DL][AAC AVC][CHT].mp4"
+        )
+        # 字符串拼接模拟从接口返回的独立字符串对象
+        yield file_name, "".join(season), "".join(anime_name), "".join(anime_name)
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    holder = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del holder
+    return current
+
+
+def build_dicts(count: int):
+    result = {}
+    for file_name, season, anime_name, folder in synthetic_rows(count):
+        result[file_name] = {
+            "season": season,
+            "anime_name": anime_name,
+            "created_at": datetime.now().isoformat(),
+            "url": records.build_strm_url(BASE_URL, season, file_name, folder),
+        }
+    return result
+
+
+def build_records(count: int):
+    result = {}
+    for file_name, season, anime_name, folder in synthetic_rows(count):
+        result[file_name] = records.ProcessedRecord(file_name, season, anime_name, folder)
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    dict_bytes = measure(lambda: build_dicts(count))
+    record_bytes = measure(lambda: build_records(count))
+    print(f"记录数: {count}")
+    print(f"dict 布局:        {dict_bytes / 1024 / 1024:8.2f} MiB ({dict_bytes / count:.0f} B/条)")
+    print(f"ProcessedRecord:  {record_bytes / 1024 / 1024:8.2f} MiB ({record_bytes / count:.0f} B/条)")
+    print(f"节省: {(1 - record_bytes / dict_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
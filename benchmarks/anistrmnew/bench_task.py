@@ -0,0 +1,216 @@
+"""
+完整任务端到端基准：本地 openani 模拟服务 + 合成存储目录
+
+场景：
+  current    当前季度
+  full       全量下载（近三年所有季度）
+  ani        当前季度 + ANi目录同步
+每个场景先冷启动（空处理记录）运行一次，再用相同数据增量运行一次，
+输出请求数/秒、文件数/秒、__task 耗时与内存峰值（tracemalloc，单独运行一次测量，不计入耗时）
+
+需要在 MoviePilot 运行环境中执行：
+  PYTHONPATH=/path/to/MoviePilot python benchmarks/anistrmnew/bench_task.py \
+      [--scenario current full ani] [--latency 0.02] [--error-rate 0.01] [--page-size 5] [--tree 20000]
+插件配置与数据保存在临时目录，不影响已安装插件
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from _plugin import load_plugin
+from openani_server import OpenAniConfig, OpenAniServer
+
+SCENARIOS = {
+    "current": {},
+    "full": {
+        "full_download": True,
+        "start_year": datetime.now().year - 2,
+        "start_season": 1,
+    },
+    "ani": {"sync_ani_dir": True},
+}
+
+
+def bench_plugin_class(server_url: str, data_dir: Path):
+    """
+    插件子类：请求指向模拟服务，配置与数据保存在内存与临时目录
+    """
+    ANiStrmNew = load_plugin()
+
+    class BenchANiStrmNew(ANiStrmNew):
+        def __init__(self):
+            super().__init__()
+            self._bench_config = {}
+            self._bench_data = {}
+
+        def init_plugin(self, config: dict = None):
+            # 目录列表与strm地址都指向模拟服务
+            super().init_plugin(
+                {**(config or {}), "endpoints": server_url, "strm_base": server_url}
+            )
+
+        def update_config(self, config: dict, *args, **kwargs):
+            self._bench_config = config
+            return True
+
+        def save_data(self, key: str, value, *args, **kwargs):
+            self._bench_data[key] = value
+
+        def get_data(self, key: str = None, *args, **kwargs):
+            return self._bench_data.get(key)
+
+        def del_data(self, key: str, *args, **kwargs):
+            self._bench_data.pop(key, None)
+
+        def get_data_path(self, *args, **kwargs) -> Path:
+            data_dir.mkdir(parents=True, exist_ok=True)
+            return data_dir
+
+        def run_task(self):
+            self._ANiStrmNew__task()
+
+    return BenchANiStrmNew
+
+
+def build_tree(root: Path, count: int):
+    """
+    合成存储目录：模拟已有的其他来源strm文件，用于衡量本地索引扫描开销
+    """
+    for i in range(count):
+        folder = root / f"已有季度{i // 1200:02d}" / f"已有番剧{i // 12:05d}"
+        if i % 12 == 0:
+            folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"已有剧集{i:06d}.strm").write_text("http://127.0.0.1/placeholder")
+
+
+def count_files(root: Path) -> int:
+    return sum(len(files) for _, _, files in os.walk(root))
+
+
+def run_once(plugin_cls, config: dict, server: OpenAniServer, memory: bool) -> dict:
+    """
+    运行一次任务（冷启动 + 增量），返回各阶段指标
+    """
+    plugin = plugin_cls()
+    plugin.init_plugin(config)
+    results = {}
+    try:
+        for phase in ("cold", "warm"):
+            plugin._full_download = config.get("full_download")
+            plugin._sync_ani_dir = config.get("sync_ani_dir")
+            before_files = count_files(Path(config["storageplace"]))
+            before_requests = server.config.requests
+            before_bytes = server.config.bytes_sent
+            before_retries = plugin._client.retries
+            if memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            plugin.run_task()
+            elapsed = time.perf_counter() - started
+            peak = 0
+            if memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            created = count_files(Path(config["storageplace"])) - before_files
+            requests = server.config.requests - before_requests
+            results[phase] = {
+                "elapsed": elapsed,
+                "requests": requests,
+                "bytes": server.config.bytes_sent - before_bytes,
+                "created": created,
+                "retries": plugin._client.retries - before_retries,
+                "peak": peak,
+            }
+    finally:
+        plugin.stop_service()
+    return results
+
+
+def run_scenario(name: str, args, server: OpenAniServer, workdir: Path) -> dict:
+    def fresh(tag: str) -> dict:
+        storage = workdir / f"{name}-{tag}" / "strm"
+        data_dir = workdir / f"{name}-{tag}" / "data"
+        shutil.copytree(workdir / "tree", storage)
+        return {
+            "config": {
+                "enabled": False,
+                "storageplace": str(storage),
+                "crawl_workers": args.workers,
+                "season_workers": args.season_workers,
+                "rate_limit": args.rate_limit,
+                "parallel_scan": args.parallel_scan,
+                "hedge_requests": args.hedge,
+                **SCENARIOS[name],
+            },
+            "plugin_cls": bench_plugin_class(server.url, data_dir),
+        }
+
+    timed = fresh("time")
+    result = run_once(timed["plugin_cls"], timed["config"], server, memory=False)
+    if not args.no_memory:
+        traced = fresh("memory")
+        memory = run_once(traced["plugin_cls"], traced["config"], server, memory=True)
+        for phase in result:
+            result[phase]["peak"] = memory[phase]["peak"]
+    return result
+
+
+def report(name: str, result: dict):
+    for phase, m in result.items():
+        elapsed = m["elapsed"] or 1e-9
+        print(
+            f"{name:<8} {phase:<5} "
+            f"{m['elapsed']:>8.2f}s "
+            f"{m['requests']:>7} req {m['requests'] / elapsed:>8.1f} req/s "
+            f"{m['created']:>7} 文件 {m['created'] / elapsed:>9.1f} 文件/s "
+            f"{m['bytes'] / 1024:>9.0f} KiB "
+            f"重试 {m['retries']:>4} "
+            f"峰值 {m['peak'] / 1024 / 1024:>7.1f} MiB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANiStrmNew 端到端基准")
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--folders", type=int, default=30, help="每个季度的番剧文件夹数")
+    parser.add_argument("--episodes", type=int, default=12, help="每个番剧文件夹的剧集数")
+    parser.add_argument("--ani-folders", type=int, default=200, help="ANi 目录下的番剧文件夹数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务请求延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 错误概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429 限流概率")
+    parser.add_argument("--page-size", type=int, default=0, help="模拟服务每页条数，0为不分页")
+    parser.add_argument("--tree", type=int, default=5000, help="合成存储目录中已有的strm文件数")
+    parser.add_argument("--workers", type=int, default=8, help="抓取并发数")
+    parser.add_argument("--season-workers", type=int, default=4, help="同时抓取的季度数")
+    parser.add_argument("--rate-limit", type=float, default=0, help="请求速率上限，0为不限速")
+    parser.add_argument("--hedge", action="store_true", help="开启对冲请求")
+    parser.add_argument("--parallel-scan", action="store_true", help="并行扫描本地目录")
+    parser.add_argument("--no-memory", action="store_true", help="不测量内存峰值")
+    args = parser.parse_args()
+
+    config = OpenAniConfig(
+        folders_per_season=args.folders,
+        episodes_per_folder=args.episodes,
+        ani_folders=args.ani_folders,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        page_size=args.page_size,
+    )
+    workdir = Path(tempfile.mkdtemp(prefix="anistrm-bench-"))
+    try:
+        build_tree(workdir / "tree", args.tree)
+        with OpenAniServer(config) as server:
+            for name in args.scenario:
+                report(name, run_scenario(name, args, server, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
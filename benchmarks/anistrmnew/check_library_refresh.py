@@ -0,0 +1,125 @@
+"""
+媒体库刷新端到端检查：本地 openani 模拟服务 + Emby 模拟服务
+
+检查项：
+  请求      POST /Library/Media/Updated，带 X-Emby-Token 请求头，
+            请求体为 {"Updates": [{"Path": 媒体服务器路径, "UpdateType": "Created"}]}，路径经过路径映射
+  分批      每个请求最多 100 个目录，全部写入strm的目录各提交一次
+  防抖      窗口内的多次运行只在窗口结束时合并刷新一次
+  失败重试  刷新失败的目录留在队列中
+
+需要在 MoviePilot 运行环境中执行：
+  PYTHONPATH=/path/to/MoviePilot python benchmarks/anistrmnew/check_library_refresh.py
+"""
+import argparse
+import math
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from bench_task import bench_plugin_class
+from emby_server import EmbyServer
+from openani_server import OpenAniConfig, OpenAniServer
+
+API_KEY = "anistrm-check-key"
+REMOTE_ROOT = "/media/anime"
+
+
+def strm_dirs(root: Path) -> set:
+    """存在strm文件的目录"""
+    return {
+        dirpath
+        for dirpath, _, files in os.walk(root)
+        if any(name.endswith(".strm") for name in files)
+    }
+
+
+def check(args, workdir: Path):
+    storage = workdir / "strm"
+    openani = OpenAniServer(
+        OpenAniConfig(
+            folders_per_season=args.folders,
+            episodes_per_folder=2,
+            ani_folders=args.ani_folders,
+        )
+    )
+    emby = EmbyServer()
+    with openani, emby:
+        plugin = bench_plugin_class(openani.url, workdir / "data")()
+        plugin.init_plugin(
+            {
+                "enabled": False,
+                "storageplace": str(storage),
+                "rate_limit": 0,
+                "library_refresh": True,
+                "mediaserver_host": emby.url,
+                "mediaserver_apikey": API_KEY,
+                "mediaserver_path_map": f"{storage}:{REMOTE_ROOT}",
+                "refresh_debounce": args.debounce / 60,
+            }
+        )
+        try:
+            plugin.run_task()
+            pending = plugin.get_data("pending_refresh")
+            assert pending and pending["paths"], "写入strm的目录应加入刷新队列"
+            since = pending["since"]
+            # 第二次运行在窗口内，目录合并到同一次刷新，窗口起点不变
+            plugin._sync_ani_dir = True
+            plugin.run_task()
+            assert time.time() - since < args.debounce, "运行耗时超过防抖窗口，调大 --debounce"
+            assert not emby.config.received(), "防抖窗口内不应通知媒体服务器"
+            pending = plugin.get_data("pending_refresh")
+            assert pending["since"] == since, "窗口内的运行不应推迟刷新"
+            assert len(pending["paths"]) > 100, "队列中的目录数应超过单批上限"
+
+            time.sleep(since + args.debounce - time.time() + 2)
+            requests = emby.config.received()
+            expected = {REMOTE_ROOT + path[len(str(storage)) :] for path in strm_dirs(storage)}
+            assert len(requests) == math.ceil(len(expected) / 100), (
+                f"{len(expected)} 个目录应分 {math.ceil(len(expected) / 100)} 批提交，实际 {len(requests)} 批"
+            )
+            assert requests[0].received >= since + args.debounce - 1, "刷新应在防抖窗口结束时执行"
+            paths = []
+            for request in requests:
+                assert request.token == API_KEY, "缺少 X-Emby-Token 请求头"
+                assert request.content_type == "application/json"
+                assert 0 < len(request.paths) <= 100, "单个请求最多提交 100 个目录"
+                assert all(u.get("UpdateType") == "Created" for u in request.payload["Updates"])
+                paths.extend(request.paths)
+            assert len(paths) == len(set(paths)), "同一目录只应提交一次"
+            assert set(paths) == expected, "提交的目录应为写入strm的目录并经过路径映射"
+            assert plugin.get_data("pending_refresh") is None, "刷新成功后应清空队列"
+            print(f"刷新：{len(paths)} 个目录，{len(requests)} 个请求，{[len(r.paths) for r in requests]}")
+
+            # 刷新失败的目录留在队列中
+            emby.config.status = 500
+            plugin.save_data(
+                "pending_refresh",
+                {"since": time.time(), "paths": sorted(strm_dirs(storage))[:3]},
+            )
+            result = plugin.flush_library_refresh()
+            assert result == {"refreshed": 0, "failed": 3}, result
+            assert len(plugin.get_data("pending_refresh")["paths"]) == 3, "失败的目录应留在队列中"
+            print("失败重试：通过")
+        finally:
+            plugin.stop_service()
+    print("媒体库刷新检查通过")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANiStrmNew 媒体库刷新检查")
+    parser.add_argument("--folders", type=int, default=150, help="每个季度的番剧文件夹数")
+    parser.add_argument("--ani-folders", type=int, default=40, help="ANi 目录下的番剧文件夹数")
+    parser.add_argument("--debounce", type=float, default=10, help="防抖窗口（秒）")
+    args = parser.parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="anistrm-check-"))
+    try:
+        check(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
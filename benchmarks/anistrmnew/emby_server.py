@@ -0,0 +1,139 @@
+"""
+本地 Emby / Jellyfin 模拟服务
+
+模拟按路径刷新媒体库接口：POST /Library/Media/Updated，
+记录每个请求的 X-Emby-Token 请求头与 JSON 请求体，返回 204；
+可配置返回的状态码，用于模拟刷新失败
+
+单独运行：python benchmarks/anistrmnew/emby_server.py --port 8096
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import urlparse
+
+UPDATED_PATH = "/Library/Media/Updated"
+
+
+class EmbyRequest:
+    """
+    收到的刷新请求
+    """
+
+    def __init__(self, token: str, content_type: str, payload: dict, received: float):
+        self.token = token
+        self.content_type = content_type
+        self.payload = payload
+        self.received = received
+
+    @property
+    def paths(self) -> List[str]:
+        return [update.get("Path") for update in self.payload.get("Updates") or []]
+
+
+class EmbyConfig:
+    """
+    模拟服务配置与收到的请求
+    """
+
+    def __init__(self, status: int = 204):
+        """
+        :param status: 刷新接口返回的状态码
+        """
+        self.status = status
+        self.lock = threading.Lock()
+        self.requests: List[EmbyRequest] = []
+
+    def received(self) -> List[EmbyRequest]:
+        with self.lock:
+            return list(self.requests)
+
+    def take(self) -> List[EmbyRequest]:
+        """取出并清空已收到的请求"""
+        with self.lock:
+            requests, self.requests = self.requests, []
+        return requests
+
+
+def make_handler(config: EmbyConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def __send(self, status: int):
+            self.send_response(status)
+            self.send_header("content-length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            length = int(self.headers.get("content-length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if urlparse(self.path).path != UPDATED_PATH:
+                self.__send(404)
+                return
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                self.__send(400)
+                return
+            with config.lock:
+                config.requests.append(
+                    EmbyRequest(
+                        token=self.headers.get("X-Emby-Token") or "",
+                        content_type=self.headers.get("Content-Type") or "",
+                        payload=payload,
+                        received=time.time(),
+                    )
+                )
+            self.__send(config.status)
+
+    return Handler
+
+
+class EmbyServer:
+    """
+    在后台线程运行的模拟服务
+    """
+
+    def __init__(self, config: EmbyConfig = None, port: int = 0):
+        self.config = config or EmbyConfig()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(self.config))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Emby / Jellyfin 模拟服务")
+    parser.add_argument("--port", type=int, default=8096)
+    parser.add_argument("--status", type=int, default=204, help="刷新接口返回的状态码")
+    args = parser.parse_args()
+    with EmbyServer(EmbyConfig(status=args.status), port=args.port) as server:
+        print(f"Emby 模拟服务已启动：{server.url}")
+        try:
+            while True:
+                time.sleep(1)
+                for request in server.config.take():
+                    print(f"收到刷新请求：{len(request.paths)} 个目录，token={request.token}")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+本地 openani 模拟服务
+
+模拟目录列表接口：POST /{季度}/、POST /{季度}/{番剧}/、POST /ANi/、POST /ANi/{番剧}/，
+返回 {"files": [...]}，番剧文件夹为 Google Drive 目录类型，剧集为 video/mp4；
+GET 剧集地址返回 206，供链接探测使用。支持配置延迟、错误注入与分页：
+设置每页条数后，超出的条目通过 nextPageToken 翻页，请求体带 page_token / page_index
+
+单独运行：python benchmarks/anistrmnew/openani_server.py --port 8080 --latency 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import unquote, urlparse
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+
+class OpenAniConfig:
+    """
+    模拟数据规模与故障注入配置
+    """
+
+    def __init__(
+        self,
+        folders_per_season: int = 30,
+        episodes_per_folder: int = 12,
+        ani_folders: int = 50,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        page_size: int = 0,
+        seed: int = 0,
+    ):
+        """
+        :param folders_per_season: 每个季度的番剧文件夹数
+        :param episodes_per_folder: 每个番剧文件夹的剧集数
+        :param ani_folders: ANi 目录下的番剧文件夹数
+        :param latency: 每个请求的固定延迟（秒）
+        :param error_rate: 返回 500 的概率
+        :param throttle_rate: 返回 429（带 Retry-After）的概率
+        :param page_size: 每页条数，0为不分页
+        """
+        self.folders_per_season = folders_per_season
+        self.episodes_per_folder = episodes_per_folder
+        self.ani_folders = ani_folders
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+
+
+def _folder_names(config: OpenAniConfig, directory: str) -> List[str]:
+    if directory == "ANi":
+        return [f"ANi番剧{i:03d}" for i in range(config.ani_folders)]
+    return [f"{directory}番剧{i:02d}" for i in range(config.folders_per_season)]
+
+
+def _listing(config: OpenAniConfig, parts: List[str]) -> Optional[List[dict]]:
+    if len(parts) == 1:
+        return [
+            {
+                "name": name,
+                "mimeType": FOLDER_MIME_TYPE,
+                "modifiedTime": "2024-01-01T00:00:00.000Z",
+            }
+            for name in _folder_names(config, parts[0])
+        ]
+    if len(parts) == 2:
+        return [
+            {
+                "name": f"[ANi] {parts[1]} - {episode:02d} [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4",
+                "mimeType": "video/mp4",
+                "modifiedTime": f"2024-01-{episode % 28 + 1:02d}T00:00:00.000Z",
+                "size": str(300_000_000 + episode),
+            }
+            for episode in range(1, config.episodes_per_folder + 1)
+        ]
+    return None
+
+
+def make_handler(config: OpenAniConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def __send(self, status: int, body: bytes = b"", headers: dict = None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+            with config.lock:
+                config.bytes_sent += len(body)
+
+        def __inject(self) -> bool:
+            with config.lock:
+                config.requests += 1
+                roll = config.random.random()
+            if config.latency:
+                time.sleep(config.latency)
+            if roll < config.throttle_rate:
+                self.__send(429, headers={"Retry-After": "1"})
+                return True
+            if roll < config.throttle_rate + config.error_rate:
+                self.__send(500)
+                return True
+            return False
+
+        def do_POST(self):
+            length = int(self.headers.get("content-length") or 0)
+            payload = self.rfile.read(length) if length else b""
+            if self.__inject():
+                return
+            parts = [p for p in unquote(urlparse(self.path).path).split("/") if p]
+            files = _listing(config, parts)
+            if files is None:
+                self.__send(404)
+                return
+            result = {"files": files}
+            if config.page_size:
+                try:
+                    token = json.loads(payload or b"{}").get("page_token")
+                except ValueError:
+                    token = None
+                start = int(token) if token else 0
+                end = start + config.page_size
+                result = {"files": files[start:end]}
+                if end < len(files):
+                    result["nextPageToken"] = str(end)
+            body = json.dumps(result).encode()
+            self.__send(200, body, {"content-type": "application/json"})
+
+        def do_GET(self):
+            if self.__inject():
+                return
+            parts = [p for p in unquote(urlparse(self.path).path).split("/") if p]
+            if len(parts) < 2:
+                self.__send(404)
+                return
+            self.__send(206, b"\0", {"content-range": "bytes 0-0/300000000"})
+
+    return Handler
+
+
+class OpenAniServer:
+    """
+    在后台线程运行的模拟服务
+    """
+
+    def __init__(self, config: OpenAniConfig = None, port: int = 0):
+        self.config = config or OpenAniConfig()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(self.config))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 openani 模拟服务")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--folders", type=int, default=30, help="每个季度的番剧文件夹数")
+    parser.add_argument("--episodes", type=int, default=12, help="每个番剧文件夹的剧集数")
+    parser.add_argument("--ani-folders", type=int, default=50, help="ANi 目录下的番剧文件夹数")
+    parser.add_argument("--latency", type=float, default=0.0, help="请求延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 错误概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429 限流概率")
+    parser.add_argument("--page-size", type=int, default=0, help="每页条数，0为不分页")
+    args = parser.parse_args()
+    config = OpenAniConfig(
+        folders_per_season=args.folders,
+        episodes_per_folder=args.episodes,
+        ani_folders=args.ani_folders,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        page_size=args.page_size,
+    )
+    with OpenAniServer(config, port=args.port) as server:
+        print(f"openani 模拟服务已启动：{server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
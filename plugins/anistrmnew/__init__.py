@@ -1,60 +1,40 @@
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, nullcontext
 from datetime import datetime, timedelta
-from urllib.parse import quote
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-from app.utils.http import RequestUtils
+from app import schemas
 from app.core.config import settings
+from app.core.event import eventmanager, Event
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Iterator
 from app.log import logger
+from app.schemas.types import EventType
 import xml.dom.minidom
 from app.utils.dom import DomUtils
 
-
-def retry(
-    ExceptionToCheck: Any,
-    tries: int = 3,
-    delay: int = 3,
-    backoff: int = 1,
-    logger: Any = None,
-    ret: Any = None,
-):
-    """
-    :param ExceptionToCheck: 需要捕获的异常
-    :param tries: 重试次数
-    :param delay: 延迟时间
-    :param backoff: 延迟倍数
-    :param logger: 日志对象
-    :param ret: 默认返回
-    """
-
-    def deco_retry(f):
-        def f_retry(*args, **kwargs):
-            mtries, mdelay = tries, delay
-            while mtries > 0:
-                try:
-                    return f(*args, **kwargs)
-                except ExceptionToCheck as e:
-                    msg = f"未获取到文件信息，{mdelay}秒后重试 ..."
-                    if logger:
-                        logger.warn(msg)
-                    else:
-                        print(msg)
-                    time.sleep(mdelay)
-                    mtries -= 1
-                    mdelay *= backoff
-            if logger:
-                logger.warn("请确保当前季度番剧文件夹存在或检查网络问题")
-            return ret
-
-        return f_retry
-
-    return deco_retry
+from .client import OPENANI_BASE, OpenAniClient
+from .crawler import FOLDER_MIME_TYPE, AniCrawler
+from .dedup import EpisodeIndex
+from .journal import CREATE, DELETE, OVERWRITE, ChangeJournal
+from .localindex import LocalIndex
+from .mediaserver import LibraryRefresher
+from .nfo import TVSHOW_NFO, episode_nfo, remove_sidecars, sidecar_path, tvshow_nfo
+from .metrics import RUN_MODES, RunMetrics
+from .parser import extract_anime_name
+from .profiling import RunProfiler
+from .prober import ALIVE, DEAD, UNKNOWN, LinkCache, LinkProber
+from .reconcile import diff_local, prune_empty_dirs, remove_files
+from .records import ProcessedRecord, build_strm_url
+from .schedule import PollPlanner
+from .store import ProcessedStore
+from .writer import StrmWriter
 
 
 class ANiStrmNew(_PluginBase):
@@ -65,7 +45,7 @@ class ANiStrmNew(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/JontyLee/MoviePilot-Plugins/main/icons/anistrm.png"
     # 插件版本
-    plugin_version = "2.4.7"
+    plugin_version = "2.4.31"
     # 插件作者
     plugin_author = "JontyLee"
     # 作者主页
@@ -88,13 +68,136 @@ class ANiStrmNew(_PluginBase):
     _full_download = False
     _overwrite_existing = False
     _sync_ani_dir = False
-    # 处理记录点：记录已处理的番剧
-    _processed_files = {}
+    # ANi目录同步时跳过季度目录中已有的剧集与番剧文件夹
+    _ani_dedup = True
+    # 写入后确保落盘
+    _fsync = False
+    # 在strm旁生成剧集与番剧元数据（nfo）
+    _write_nfo = False
+    # 已确认存在番剧元数据的目录
+    _nfo_dirs = set()
+    # 对接下来的若干次定时运行做性能剖析，0为关闭
+    _profile_runs = 0
+    # 保留的剖析报告数
+    _profile_keep = 10
+    # 记录strm文件的创建、覆盖与删除
+    _change_journal = False
+    _journal: Optional[ChangeJournal] = None
+    # 并发扫描本地目录
+    _parallel_scan = False
+    # 增量抓取：跳过修改时间未变化的番剧文件夹
+    _incremental = True
+    # 季度根目录连续未变化多少次后封存，0为不封存
+    _seal_runs = 3
+    # 目录快照最长有效时间（小时），超过后重新列出番剧文件夹，0为不限制
+    _snapshot_max_hours = 24
+    # 待解封的季度
+    _unseal_seasons = None
+    # 全局抓取并发数
+    _crawl_workers = 8
+    # 单季度抓取并发数
+    _season_workers = 4
+    # 连接池大小
+    _pool_size = 8
+    # 请求超时时间（秒）
+    _timeout = 20
+    # 最大请求速率（次/秒），0为不限速
+    _rate_limit = 10
+    # 单个请求最大重试次数
+    _max_retries = 3
+    # 单个目录每次运行最多翻页数，0为不限制
+    _max_pages = 50
+    # 目录列表使用的站点，多个以逗号或换行分隔，为空时使用官方站点
+    _endpoints = ""
+    # strm文件中播放地址使用的站点
+    _strm_base = OPENANI_BASE
+    # 请求超过站点p95延迟未返回时向另一站点发送对冲请求
+    _hedge_requests = False
+    # 创建strm后按目录通知媒体服务器刷新
+    _library_refresh = False
+    # 媒体服务器地址与API密钥
+    _mediaserver_host = ""
+    _mediaserver_apikey = ""
+    # 路径映射：本地路径:媒体服务器路径
+    _mediaserver_path_map = ""
+    # 刷新防抖窗口（分钟），窗口内多次运行的目录合并刷新
+    _refresh_debounce = 5
+    # 单次运行最大请求数，0为不限制
+    _max_requests = 0
+    # 单次运行最长时间（分钟），0为不限制
+    _max_minutes = 0
+    # 断点：已完成的番剧文件夹（季度/番剧文件夹）
+    _checkpoint_done = set()
+    # 断点：已完成的季度，继续时不再列出
+    _checkpoint_seasons = set()
+    # 断点：最后完成的番剧文件夹
+    _checkpoint_position = None
+    # 本次运行开始时间、开始时的请求数、上次保存断点的时间、新创建数
+    _run_started = 0.0
+    _run_requests_base = 0
+    _last_checkpoint = 0.0
+    _run_created = 0
+    # 检测失效链接（执行一次后关闭）
+    _validate_links = False
+    # 隔离失效的strm文件
+    _quarantine_dead = False
+    # 链接探测并发数
+    _probe_workers = 16
+    # 链接探测结果缓存时间（小时）
+    _link_cache_hours = 24
+    # 按放送时间轮询，替代固定执行周期
+    _adaptive_schedule = False
+    # 预计上线窗口内的轮询间隔（分钟）
+    _hot_minutes = 10
+    # 连载中番剧的轮询间隔（小时）
+    _warm_hours = 3
+    # 长时间未更新番剧的轮询间隔（小时）
+    _cold_hours = 168
+    # 清理上游已删除的strm文件（执行一次后关闭）
+    _reconcile = False
+    # 清理时只生成报告，不删除文件
+    _reconcile_dry_run = True
+    # 链接探测互斥
+    _probe_lock = threading.Lock()
+    # 定时任务与指定刷新互斥
+    _task_lock = threading.Lock()
+    # 媒体库刷新队列互斥
+    _refresh_lock = threading.Lock()
+    # 本次运行写入strm的目录
+    _touched_dirs = set()
+    # 当前抓取中写入失败的番剧文件夹（季度/番剧文件夹）与季度，不记入快照
+    _write_failures = set()
+    _refresher: Optional[LibraryRefresher] = None
+    # 处理记录点：记录已处理的番剧，存放于插件数据目录
+    _store: Optional[ProcessedStore] = None
+    # 番剧文件夹快照：{季度/番剧文件夹: {"modified", "count", "etag"}}
+    _folder_snapshots = {}
+    # 本次运行产生、待保存的快照
+    _pending_snapshots = {}
+    # 季度索引：{季度: {"etag", "stable_runs", "sealed"}}
+    _season_index = {}
+    # 本次运行的季度抓取结果
+    _pending_seasons = {}
     # 当前季度
     _date = None
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
+    # openani 请求客户端
+    _client: Optional[OpenAniClient] = None
+    # strm写入器，每次运行重建
+    _writer: Optional[StrmWriter] = None
+    # 本地strm文件索引，每次运行重建
+    _local_index: Optional[LocalIndex] = None
+    # 本次运行的指标
+    _metrics: Optional[RunMetrics] = None
+    _metrics_base: Tuple[int, int] = (0, 0)
+    # 放送轮询计划
+    _planner: Optional[PollPlanner] = None
+    # 跨来源剧集去重索引，同步ANi目录时每次运行重建
+    _episode_index: Optional[EpisodeIndex] = None
+    # 保留最近的运行指标条数
+    _metrics_history = 30
 
     def init_plugin(self, config: dict = None):
         # 停止现有任务
@@ -110,7 +213,52 @@ class ANiStrmNew(_PluginBase):
             self._full_download = config.get("full_download")
             self._overwrite_existing = config.get("overwrite_existing")
             self._sync_ani_dir = config.get("sync_ani_dir")
-            self._processed_files = config.get("processed_files", {})
+            self._ani_dedup = config.get("ani_dedup", True)
+            self._incremental = config.get("incremental", True)
+            self._fsync = config.get("fsync", False)
+            self._parallel_scan = config.get("parallel_scan", False)
+            self._seal_runs = int(config.get("seal_runs", 3) or 0)
+            self._snapshot_max_hours = float(config.get("snapshot_max_hours", 24) or 0)
+            self._unseal_seasons = config.get("unseal_seasons")
+            self._crawl_workers = int(config.get("crawl_workers") or 8)
+            self._season_workers = int(config.get("season_workers") or 4)
+            self._pool_size = int(config.get("pool_size") or self._crawl_workers)
+            self._timeout = int(config.get("timeout") or 20)
+            self._rate_limit = float(config.get("rate_limit", 10) or 0)
+            self._max_retries = int(config.get("max_retries", 3) or 0)
+            self._max_pages = int(config.get("max_pages", 50) or 0)
+            self._endpoints = config.get("endpoints") or ""
+            self._strm_base = (config.get("strm_base") or OPENANI_BASE).strip().rstrip("/")
+            self._hedge_requests = config.get("hedge_requests", False)
+            self._write_nfo = config.get("write_nfo", False)
+            self._change_journal = config.get("change_journal", False)
+            self._profile_runs = int(config.get("profile_runs") or 0)
+            self._profile_keep = int(config.get("profile_keep") or 10)
+            self._library_refresh = config.get("library_refresh", False)
+            self._mediaserver_host = config.get("mediaserver_host") or ""
+            self._mediaserver_apikey = config.get("mediaserver_apikey") or ""
+            self._mediaserver_path_map = config.get("mediaserver_path_map") or ""
+            self._refresh_debounce = float(config.get("refresh_debounce", 5) or 0)
+            self._max_requests = int(config.get("max_requests") or 0)
+            self._max_minutes = float(config.get("max_minutes") or 0)
+            self._validate_links = config.get("validate_links", False)
+            self._quarantine_dead = config.get("quarantine_dead", False)
+            self._reconcile = config.get("reconcile", False)
+            self._reconcile_dry_run = config.get("reconcile_dry_run", True)
+            self._probe_workers = int(config.get("probe_workers") or 16)
+            self._link_cache_hours = float(config.get("link_cache_hours") or 24)
+            self._adaptive_schedule = config.get("adaptive_schedule", False)
+            self._hot_minutes = float(config.get("hot_minutes") or 10)
+            self._warm_hours = float(config.get("warm_hours") or 3)
+            self._cold_hours = float(config.get("cold_hours") or 168)
+
+            # 解封季度，插件未启用时同样生效；应用后清空配置，避免每次加载重复解封
+            if self._unseal_seasons:
+                # 定时任务已在停止服务时结束，等待仍在进行的指定刷新等任务
+                with self._task_lock:
+                    self.__unseal(self._unseal_seasons)
+                self._unseal_seasons = None
+                self.__update_config()
 
             # 验证存储路径
             if not self._storageplace:
@@ -118,12 +266,77 @@ class ANiStrmNew(_PluginBase):
                 self._enabled = False
                 return
 
+        # 处理记录库，旧版本记录在插件配置中，迁移后从配置中移除
+        self._store = ProcessedStore(self.get_data_path() / "processed.db")
+        if config and config.get("processed_files"):
+            self._store.migrate(config.get("processed_files"))
+            self.__update_config()
+
+        # 变更日志
+        self._journal = None
+        if self._change_journal:
+            self._journal = ChangeJournal(self.get_data_path() / "journal")
+
+        # 共享请求客户端
+        self._client = OpenAniClient(
+            endpoints=self._endpoints.replace("\n", ",").split(","),
+            # 链接探测与目录抓取共用连接池
+            pool_size=max(self._pool_size, self._probe_workers),
+            timeout=self._timeout,
+            rate_limit=self._rate_limit,
+            max_retries=self._max_retries,
+            max_pages=self._max_pages,
+            hedge=self._hedge_requests,
+        )
+
+        # 媒体库刷新
+        self._refresher = None
+        self._touched_dirs = set()
+        self._nfo_dirs = set()
+        if self._library_refresh:
+            if self._mediaserver_host and self._mediaserver_apikey:
+                self._refresher = LibraryRefresher(
+                    host=self._mediaserver_host,
+                    apikey=self._mediaserver_apikey,
+                    path_map=self._mediaserver_path_map,
+                    timeout=self._timeout,
+                )
+            else:
+                logger.warning("未配置媒体服务器地址或API密钥，不通知媒体库刷新")
+
+        # 放送轮询计划
+        self._planner = None
+        if self._adaptive_schedule:
+            self._planner = PollPlanner(
+                self.get_data("poll_plan"),
+                hot_minutes=self._hot_minutes,
+                warm_hours=self._warm_hours,
+                cold_hours=self._cold_hours,
+            )
+
         # 加载模块
-        if self._enabled or self._onlyonce:
+        if (
+            self._enabled
+            or self._onlyonce
+            or self._validate_links
+            or self._reconcile
+            or self._refresher
+        ):
             # 定时服务
             self._scheduler = BackgroundScheduler(timezone=settings.TZ)
 
-            if self._enabled and self._cron:
+            if self._enabled and self._adaptive_schedule:
+                # 按最短轮询间隔检查到期的番剧文件夹
+                self._scheduler.add_job(
+                    func=self.__poll_task,
+                    trigger="interval",
+                    minutes=self._hot_minutes,
+                    next_run_time=datetime.now(tz=pytz.timezone(settings.TZ))
+                    + timedelta(seconds=10),
+                    name="ANiStrm放送轮询",
+                )
+                logger.info(f"ANi-Strm放送轮询已启用，检查间隔 {self._hot_minutes} 分钟")
+            elif self._enabled and self._cron:
                 try:
                     self._scheduler.add_job(
                         func=self.__task,
@@ -135,7 +348,7 @@ class ANiStrmNew(_PluginBase):
                     logger.error(f"定时任务配置错误：{str(err)}")
 
             if self._onlyonce:
-                logger.info(f"ANi-Strm服务启动，立即运行一次")
+                logger.info("ANi-Strm服务启动，立即运行一次")
                 self._scheduler.add_job(
                     func=self.__task,
                     trigger="date",
@@ -146,6 +359,29 @@ class ANiStrmNew(_PluginBase):
                 # 关闭一次性开关
                 self._onlyonce = False
 
+            if self._validate_links:
+                logger.info("ANi-Strm失效链接检测，立即运行一次")
+                self._scheduler.add_job(
+                    func=self.validate_links,
+                    trigger="date",
+                    run_date=datetime.now(tz=pytz.timezone(settings.TZ))
+                    + timedelta(seconds=5),
+                    name="ANiStrm失效链接检测",
+                )
+                self._validate_links = False
+
+            if self._reconcile:
+                logger.info("ANi-Strm清理上游已删除的文件，立即运行一次")
+                self._scheduler.add_job(
+                    func=self.reconcile,
+                    kwargs={"dry_run": self._reconcile_dry_run},
+                    trigger="date",
+                    run_date=datetime.now(tz=pytz.timezone(settings.TZ))
+                    + timedelta(seconds=5),
+                    name="ANiStrm清理失效文件",
+                )
+                self._reconcile = False
+
             self.__update_config()
 
             # 启动任务
@@ -153,6 +389,11 @@ class ANiStrmNew(_PluginBase):
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+            # 上次未完成的媒体库刷新
+            pending = self.get_data("pending_refresh")
+            if self._refresher and pending:
+                self.__schedule_library_refresh(pending.get("since") or time.time())
+
     def __get_ani_season(self, idx_month: int = None) -> str:
         """获取当前季度"""
         current_date = datetime.now()
@@ -201,448 +442,1053 @@ class ANiStrmNew(_PluginBase):
 
         return seasons
 
-    @retry(Exception, tries=3, logger=logger, ret=[])
-    def get_current_season_list(self) -> List:
-        """获取当前季度的番剧列表"""
-        season = self.__get_ani_season()
-        url = f"https://openani.an-i.workers.dev/{season}/"
-
-        headers = {
-            "accept": "*/*",
-            "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "origin": "https://openani.an-i.workers.dev",
-            "priority": "u=1, i",
-            "referer": "https://openani.an-i.workers.dev/",
-            "sec-ch-ua": '"Chromium";v="142", "Microsoft Edge";v="142", "Not_A Brand";v="99"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"macOS"',
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-origin",
-            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0",
-            "x-requested-with": "XMLHttpRequest",
+    def __crawler(self) -> AniCrawler:
+        """按配置的并发数创建抓取器，覆盖模式下不使用快照"""
+        use_snapshots = self._incremental and not self._overwrite_existing
+        self._write_failures = set()
+        return AniCrawler(
+            list_folder=self._client.list_folder,
+            iter_folder=self._client.iter_folder,
+            max_workers=self._crawl_workers,
+            season_workers=self._season_workers,
+            snapshots=self._folder_snapshots if use_snapshots else None,
+            season_index=None if self._overwrite_existing else self._season_index,
+            skip=self._checkpoint_done,
+            on_complete=self.__on_folder_complete,
+            on_season_complete=self.__on_season_complete,
+            skip_folder=self.__covered if self._episode_index is not None else None,
+            write_failed=self._write_failures.__contains__,
+            snapshot_max_age=self._snapshot_max_hours * 3600,
+        )
+
+    def __covered(self, season: str, folder: str) -> bool:
+        """ANi目录中已被季度目录覆盖的番剧文件夹"""
+        return season == "ANi" and self._episode_index.covers(folder)
+
+    def __build_episode_index(self):
+        """以已处理的季度记录与已知的季度番剧文件夹建立去重索引"""
+        self._episode_index = EpisodeIndex()
+        self._episode_index.seed(
+            (record.file_name, record.folder)
+            for record in self._store.records()
+            if record.season != "ANi"
+        )
+        for key in self._folder_snapshots:
+            season, _, folder = key.partition("/")
+            if season != "ANi":
+                self._episode_index.add_folder(folder)
+
+    def __run_mode(self) -> dict:
+        """断点对应的运行模式，模式变化后断点失效"""
+        return {
+            "full_download": bool(self._full_download),
+            "start_year": self._start_year,
+            "start_season": self._start_season,
+            "season": self._date,
         }
-        data = '{"password":"null"}'
 
-        rep = RequestUtils(
-            ua=settings.USER_AGENT if settings.USER_AGENT else None,
-            proxies=settings.PROXY if settings.PROXY else None,
-        ).post(url=url, headers=headers, data=data)
-        logger.debug(rep.text)
+    def __load_checkpoint(self):
+        """加载上次中断时的断点"""
+        checkpoint = self.get_data("checkpoint") or {}
+        if checkpoint and checkpoint.get("mode") == self.__run_mode():
+            self._checkpoint_done = set(checkpoint.get("done") or [])
+            self._checkpoint_seasons = set(checkpoint.get("seasons") or [])
+            self._checkpoint_position = checkpoint.get("position")
+            logger.info(
+                f"从断点继续：已完成 {len(self._checkpoint_seasons)} 个季度、"
+                f"{len(self._checkpoint_done)} 个番剧文件夹，"
+                f"上次位置 {self._checkpoint_position}，上次新建 {checkpoint.get('created', 0)} 个strm文件"
+            )
+        else:
+            self._checkpoint_done = set()
+            self._checkpoint_seasons = set()
+            self._checkpoint_position = None
+
+    def __save_checkpoint(self):
+        """保存断点：已写入的文件、快照与抓取位置"""
+        self._writer.flush()
+        self._store.commit()
+        if self._pending_snapshots:
+            self._folder_snapshots.update(self._pending_snapshots)
+            self.save_data("folder_snapshots", self._folder_snapshots)
+            self._pending_snapshots = {}
+        self.save_data(
+            "checkpoint",
+            {
+                "mode": self.__run_mode(),
+                "seasons": sorted(self._checkpoint_seasons),
+                "done": sorted(self._checkpoint_done),
+                "position": self._checkpoint_position,
+                "created": self._run_created,
+                "updated_at": datetime.now().isoformat(),
+            },
+        )
+        self._last_checkpoint = time.monotonic()
+
+    def __on_folder_complete(self, key: str):
+        """番剧文件夹处理完成，定期保存断点"""
+        self._checkpoint_done.add(key)
+        self._checkpoint_position = key
+        if time.monotonic() - self._last_checkpoint >= 30:
+            self.__save_checkpoint()
+
+    def __on_season_complete(self, season: str):
+        """季度处理完成，断点中以季度代替其下的番剧文件夹"""
+        self._checkpoint_seasons.add(season)
+        prefix = f"{season}/"
+        self._checkpoint_done.difference_update(
+            [key for key in self._checkpoint_done if key.startswith(prefix)]
+        )
+
+    def __budget_exhausted(self) -> bool:
+        """本次运行的请求数或时间是否已用完"""
+        if (
+            self._max_requests
+            and self._client.requests - self._run_requests_base >= self._max_requests
+        ):
+            logger.info(f"已达到单次运行最大请求数 {self._max_requests}")
+            return True
+        if (
+            self._max_minutes
+            and time.monotonic() - self._run_started >= self._max_minutes * 60
+        ):
+            logger.info(f"已达到单次运行最长时间 {self._max_minutes} 分钟")
+            return True
+        return False
 
-        anime_folders = rep.json().get("files", [])
-        episode_files_list = []
+    @staticmethod
+    def __is_sealable(season: str) -> bool:
+        """一年前的季度才允许封存"""
+        try:
+            year, month = season.split("-")
+            season_date = datetime(int(year), int(month), 1)
+        except ValueError:
+            return False
+        return season_date < datetime.now() - timedelta(days=365)
 
-        for item in anime_folders:
-            # Case 1: Item is a folder
-            if item.get("mimeType") == "application/vnd.google-apps.folder":
-                try:
-                    folder_name = item.get("name")
-                    encoded_folder_name = quote(folder_name)
-                    folder_url = f"https://openani.an-i.workers.dev/{season}/{encoded_folder_name}/"
-
-                    nested_headers = headers.copy()
-                    nested_headers["referer"] = folder_url
-
-                    folder_rep = RequestUtils(
-                        ua=settings.USER_AGENT if settings.USER_AGENT else None,
-                        proxies=settings.PROXY if settings.PROXY else None,
-                    ).post(url=folder_url, headers=nested_headers, data=data)
-
-                    if folder_rep and folder_rep.status_code == 200:
-                        episodes = folder_rep.json().get("files", [])
-                        for file in episodes:
-                            if "video" in file.get("mimeType", ""):
-                                episode_files_list.append(file["name"])
-                except Exception as e:
-                    logger.warning(
-                        f'处理番剧文件夹 {item.get("name")} 时出错: {str(e)}'
-                    )
-                    continue
-            # Case 2: Item is a video file directly in the season directory
-            elif "video" in item.get("mimeType", ""):
-                file_name = item.get("name")
-                logger.info(f"  发现根目录文件: {file_name}")
-                episode_files_list.append(file_name)
+    def __update_season_index(self):
+        """根据本次抓取结果更新季度索引，连续完整且未变化的旧季度标记为封存"""
+        for season, result in self._pending_seasons.items():
+            entry = self._season_index.get(season) or {}
+            if result.get("verified"):
+                continue
+            if not result.get("complete"):
+                entry.update({"stable_runs": 0, "sealed": False})
+            else:
+                stable_runs = (
+                    entry.get("stable_runs", 0) + 1
+                    if entry.get("etag") == result["etag"]
+                    else 1
+                )
+                entry.update(
+                    {"etag": result["etag"], "stable_runs": stable_runs, "sealed": False}
+                )
+                if (
+                    self._seal_runs
+                    and stable_runs >= self._seal_runs
+                    and self.__is_sealable(season)
+                ):
+                    logger.info(f"{season} 连续 {stable_runs} 次未变化，已封存")
+                    entry["sealed"] = True
+            self._season_index[season] = entry
+        self._pending_seasons = {}
+
+    def unseal_season(self, season: str = None) -> schemas.Response:
+        """
+        解封季度，多个季度用逗号分隔，all 表示全部
+        任务运行中会在结束时保存内存中的季度索引，与任务互斥，避免解封被覆盖
+        """
+        if not season:
+            return schemas.Response(success=False, message="未指定季度")
+        if not self._task_lock.acquire(blocking=False):
+            return schemas.Response(success=False, message="任务正在运行中，请稍后再试")
+        try:
+            unsealed = self.__unseal(season)
+        finally:
+            self._task_lock.release()
+        return schemas.Response(success=True, message=f"已解封 {len(unsealed)} 个季度", data=unsealed)
+
+    def __unseal(self, season: str) -> List[str]:
+        """解封季度并保存季度索引，调用方持有任务锁"""
+        season_index = self.get_data("season_index") or {}
+        if season.strip().lower() == "all":
+            targets = list(season_index.keys())
+        else:
+            targets = [s.strip() for s in season.split(",") if s.strip()]
+        unsealed = []
+        for target in targets:
+            entry = season_index.get(target)
+            if entry and entry.get("sealed"):
+                entry.update({"sealed": False, "stable_runs": 0})
+                unsealed.append(target)
+        self.save_data("season_index", season_index)
+        self._season_index = season_index
+        logger.info(f"已解封季度: {unsealed}")
+        return unsealed
 
-        return episode_files_list
+    def get_current_season_list(self) -> List:
+        """获取当前季度的番剧列表"""
+        season = self.__get_ani_season()
+        return [file["name"] for file in self.__crawler().crawl([season])]
 
-    def get_all_seasons_list(self) -> List[Dict]:
-        """获取所有季度的番剧列表"""
-        all_files = []
+    def iter_all_seasons_list(self) -> Iterator[List[Dict]]:
+        """流式获取所有季度的番剧列表，每个番剧文件夹产出一批"""
         seasons = self.__get_all_seasons()
+        if self._checkpoint_seasons:
+            # 断点中已完成的季度不再列出根目录
+            seasons = [season for season in seasons if season not in self._checkpoint_seasons]
 
         logger.info(f"准备获取 {len(seasons)} 个季度的番剧: {seasons}")
 
-        headers = {
-            "accept": "*/*",
-            "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "origin": "https://openani.an-i.workers.dev",
-            "priority": "u=1, i",
-            "referer": "https://openani.an-i.workers.dev/",
-            "sec-ch-ua": '"Chromium";v="142", "Microsoft Edge";v="142", "Not_A Brand";v="99"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"macOS"',
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-origin",
-            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0",
-            "x-requested-with": "XMLHttpRequest",
-        }
-        data = '{"password":"null"}'
-
-        for season in seasons:
-            try:
-                # First request: get anime folders in the season
-                season_url = f"https://openani.an-i.workers.dev/{season}/"
-                rep = RequestUtils(
-                    ua=settings.USER_AGENT if settings.USER_AGENT else None,
-                    proxies=settings.PROXY if settings.PROXY else None,
-                ).post(url=season_url, headers=headers, data=data)
-
-                if not (rep and rep.status_code == 200):
-                    logger.warning(
-                        f'获取 {season} 季度失败: HTTP {rep.status_code if rep else "无响应"}'
-                    )
-                    continue
-
-                anime_folders = rep.json().get("files", [])
-                logger.info(f"获取 {season} 季度: {len(anime_folders)} 个番剧文件夹")
-
-                # Second level: get episode files from each anime folder
-                for item in anime_folders:
-                    if item.get("mimeType") == "application/vnd.google-apps.folder":
-                        try:
-                            folder_name = item.get("name")
-                            encoded_folder_name = quote(folder_name)
-                            folder_url = f"https://openani.an-i.workers.dev/{season}/{encoded_folder_name}/"
-
-                            # Update referer for the nested request
-                            nested_headers = headers.copy()
-                            nested_headers["referer"] = folder_url
-
-                            folder_rep = RequestUtils(
-                                ua=settings.USER_AGENT if settings.USER_AGENT else None,
-                                proxies=settings.PROXY if settings.PROXY else None,
-                            ).post(url=folder_url, headers=nested_headers, data=data)
-
-                            if not (folder_rep and folder_rep.status_code == 200):
-                                logger.warning(
-                                    f'获取番剧 {folder_name} 内容失败: HTTP {folder_rep.status_code if folder_rep else "无响应"}'
-                                )
-                                continue
-
-                            episode_files = folder_rep.json().get("files", [])
-                            logger.info(
-                                f"  获取 {folder_name}: {len(episode_files)} 个剧集文件"
-                            )
-
-                            for file in episode_files:
-                                # We only care about video files, not sub-folders or other types
-                                if "video" in file.get("mimeType", ""):
-                                    all_files.append(
-                                        {
-                                            "name": file["name"],
-                                            "season": season,
-                                            "folder": folder_name,
-                                        }
-                                    )
-
-                        except Exception as e:
-                            logger.warning(
-                                f'处理番剧文件夹 {item.get("name")} 时出错: {str(e)}'
-                            )
-                            continue
-                    elif "video" in item.get("mimeType", ""):
-                        file_name = item.get("name")
-                        logger.info(f"  发现根目录文件: {file_name}")
-                        all_files.append({"name": file_name, "season": season})
-
-                # Add delay between seasons
-                time.sleep(0.5)
-
-            except Exception as e:
-                logger.warning(f"获取 {season} 季度失败: {str(e)}")
-                continue
+        crawler = self.__crawler()
+        try:
+            yield from crawler.iter_crawl(seasons)
+        finally:
+            self._pending_snapshots.update(crawler.updated_snapshots)
+            self._pending_seasons.update(crawler.updated_seasons)
+            if self._metrics:
+                self._metrics.add_seasons(crawler.stats.seasons)
 
+    def get_all_seasons_list(self) -> List[Dict]:
+        """获取所有季度的番剧列表"""
+        all_files = [file for batch in self.iter_all_seasons_list() for file in batch]
         logger.info(f"总共获取到 {len(all_files)} 个番剧文件")
         return all_files
 
-    @retry(Exception, tries=3, logger=logger, ret=[])
-    def get_ani_list(self) -> List[Dict]:
-        """获取ANi目录的番剧列表"""
-        all_files = []
-        url = f"https://openani.an-i.workers.dev/ANi/"
-        logger.info(f"准备获取 ANi 目录的番剧")
-
-        headers = {
-            "accept": "*/*",
-            "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "origin": "https://openani.an-i.workers.dev",
-            "priority": "u=1, i",
-            "referer": "https://openani.an-i.workers.dev/",
-            "sec-ch-ua": '"Chromium";v="142", "Microsoft Edge";v="142", "Not_A Brand";v="99"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"macOS"',
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-origin",
-            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0",
-            "x-requested-with": "XMLHttpRequest",
-        }
-        data = '{"password":"null"}'
+    def iter_ani_list(self) -> Iterator[List[Dict]]:
+        """流式获取ANi目录的番剧列表，每个番剧文件夹产出一批"""
+        logger.info("准备获取 ANi 目录的番剧")
 
+        crawler = self.__crawler()
         try:
-            # First request: get anime folders in ANi dir
-            rep = RequestUtils(
-                ua=settings.USER_AGENT if settings.USER_AGENT else None,
-                proxies=settings.PROXY if settings.PROXY else None,
-            ).post(url=url, headers=headers, data=data)
-
-            if not (rep and rep.status_code == 200):
-                logger.warning(
-                    f'获取 ANi 目录失败: HTTP {rep.status_code if rep else "无响应"}'
-                )
-                return all_files
-
-            anime_folders = rep.json().get("files", [])
-            logger.info(f"获取 ANi 目录: {len(anime_folders)} 个番剧文件夹")
-
-            # Second level: get episode files from each anime folder
-            for folder in anime_folders:
-                if folder.get("mimeType") != "application/vnd.google-apps.folder":
-                    continue
-
-                try:
-                    folder_name = folder.get("name")
-                    encoded_folder_name = quote(folder_name)
-                    folder_url = (
-                        f"https://openani.an-i.workers.dev/ANi/{encoded_folder_name}/"
-                    )
-
-                    # Update referer for the nested request
-                    nested_headers = headers.copy()
-                    nested_headers["referer"] = folder_url
-
-                    folder_rep = RequestUtils(
-                        ua=settings.USER_AGENT if settings.USER_AGENT else None,
-                        proxies=settings.PROXY if settings.PROXY else None,
-                    ).post(url=folder_url, headers=nested_headers, data=data)
+            # 提前结束时先关闭抓取，已处理的番剧文件夹记入快照后再收集
+            with closing(crawler.iter_crawl(["ANi"])) as batches:
+                for batch in batches:
+                    # ANi目录下只处理番剧文件夹，忽略根目录文件
+                    batch = [file for file in batch if file.get("folder")]
+                    if batch:
+                        yield batch
+        finally:
+            self._pending_snapshots.update(crawler.updated_snapshots)
+            if self._metrics:
+                self._metrics.add_seasons(crawler.stats.seasons)
 
-                    if not (folder_rep and folder_rep.status_code == 200):
-                        logger.warning(
-                            f'获取番剧 {folder_name} 内容失败: HTTP {folder_rep.status_code if folder_rep else "无响应"}'
-                        )
-                        continue
+    def get_ani_list(self) -> List[Dict]:
+        """获取ANi目录的番剧列表"""
+        all_files = [file for batch in self.iter_ani_list() for file in batch]
+        logger.info(f"总共从ANi目录获取到 {len(all_files)} 个番剧文件")
+        return all_files
 
-                    episode_files = folder_rep.json().get("files", [])
-                    logger.info(
-                        f"  获取 {folder_name}: {len(episode_files)} 个剧集文件"
-                    )
+    def _validate_strm_url(self, url: str) -> bool:
+        """验证 strm URL 是否可访问，只请求首字节"""
+        status = LinkProber(self._client).probe(url)
+        if status == ALIVE:
+            logger.debug(f"URL 验证成功: {url[:100]}...")
+        else:
+            logger.warning(f"URL 验证失败 ({status}): {url[:100]}...")
+        return status == ALIVE
 
-                    for file in episode_files:
-                        # We only care about video files, not sub-folders or other types
-                        if "video" in file.get("mimeType", ""):
-                            all_files.append(
-                                {
-                                    "name": file["name"],
-                                    "season": "ANi",
-                                    "folder": folder_name,
-                                }
-                            )
-
-                except Exception as e:
-                    logger.warning(
-                        f'处理番剧文件夹 {folder.get("name")} 时出错: {str(e)}'
+    def validate_links(self, quarantine: bool = None) -> Optional[dict]:
+        """
+        批量检测本地strm文件中的链接，失效的可移入插件数据目录下的隔离目录
+        :param quarantine: 是否隔离失效文件，默认按配置
+        """
+        if not self._storageplace:
+            return None
+        if not self._probe_lock.acquire(blocking=False):
+            logger.info("失效链接检测正在运行中")
+            return None
+        try:
+            quarantine = self._quarantine_dead if quarantine is None else quarantine
+            local_index = LocalIndex(
+                self._storageplace,
+                parallel=self._parallel_scan,
+                workers=self._crawl_workers,
+            )
+            local_index.scan()
+            cache = LinkCache(
+                self.get_data_path() / "links.db",
+                ttl=int(self._link_cache_hours * 3600),
+            )
+            try:
+                prober = LinkProber(
+                    self._client,
+                    cache=cache,
+                    workers=self._probe_workers,
+                    rate_limit=self._probe_workers * 2,
+                )
+                result = prober.probe_files(sorted(local_index.files))
+            finally:
+                cache.close()
+            moved = []
+            if quarantine and result[DEAD]:
+                moved = LinkProber.quarantine(
+                    result[DEAD], self._storageplace, self.get_data_path() / "quarantine"
+                )
+                logger.info(f"已隔离 {len(moved)} 个失效strm文件")
+                if self._journal:
+                    self._journal.extend(
+                        DELETE,
+                        (f for f in result[DEAD] if not os.path.exists(f)),
+                        reason="dead_link",
                     )
-                    continue
+            report = {
+                "checked_at": datetime.now().isoformat(),
+                "total": len(local_index.files),
+                "alive": len(result[ALIVE]),
+                "dead": len(result[DEAD]),
+                "unknown": len(result[UNKNOWN]),
+                "quarantined": len(moved),
+                "dead_files": result[DEAD][:200],
+            }
+            self.save_data("link_report", report)
+            return report
+        finally:
+            self._probe_lock.release()
+
+    def api_validate_links(self, quarantine: bool = False) -> schemas.Response:
+        """后台运行失效链接检测，返回上次检测报告"""
+        threading.Thread(
+            target=self.validate_links, args=(quarantine,), daemon=True
+        ).start()
+        return schemas.Response(
+            success=True,
+            message="失效链接检测已开始",
+            data=self.get_data("link_report"),
+        )
 
+    def __list_folder(self, path: str) -> Optional[List[dict]]:
+        """列出目录，响应无法解析等异常视为失败"""
+        try:
+            return self._client.list_folder(path)
         except Exception as e:
-            logger.warning(f"获取 ANi 目录失败: {str(e)}")
-
-        logger.info(f"总共从ANi目录获取到 {len(all_files)} 个番剧文件")
-        return all_files
+            logger.error(f"获取 {path} 目录失败：{str(e)}")
+            return None
 
-    @retry(Exception, tries=3, logger=logger, ret=[])
-    def _validate_strm_url(self, url: str) -> bool:
-        """验证 strm URL 是否可访问"""
+    def refresh(self, season: str = None, folder: str = None) -> Optional[dict]:
+        """
+        立即刷新指定季度、番剧文件夹或ANi目录，不经过全量抓取
+        已封存的季度同样刷新；只扫描该季度的本地目录
+        :param season: 季度（如 2024-10）或 ANi，默认当前季度
+        :param folder: 番剧文件夹名称，为空则刷新整个季度
+        :return: 刷新结果，任务运行中返回None
+        """
+        if not self._storageplace:
+            logger.error("未配置Strm存储地址，无法刷新")
+            return None
+        if self._client is None:
+            logger.error("插件未启用，无法刷新")
+            return None
+        if not self._task_lock.acquire(blocking=False):
+            logger.info("ANi-Strm任务正在运行中，跳过本次刷新")
+            return None
         try:
-            # 发送 HEAD 请求检查 URL 是否可访问
-            response = RequestUtils(
-                ua=settings.USER_AGENT if settings.USER_AGENT else None,
-                proxies=settings.PROXY if settings.PROXY else None,
-            ).get_res(url, allow_redirects=True, timeout=10)
-
-            if response and response.status_code in [200, 206, 302, 301]:
-                logger.debug(f"URL 验证成功: {url[:100]}...")
-                return True
+            started = time.monotonic()
+            current = self.__get_ani_season()
+            season = (season or "").strip().strip("/") or current
+            folder = (folder or "").strip().strip("/") or None
+            target = f"{season}/{folder}" if folder else season
+            logger.info(f"开始刷新 {target}")
+            self.__start_metrics("refresh")
+
+            self.__prepare_local([season])
+            list_started = time.monotonic()
+
+            files = []
+            if folder:
+                items = self.__list_folder(target)
+                if items is None:
+                    return {"target": target, "error": "获取目录失败"}
+                files = [
+                    {
+                        "name": item["name"],
+                        "season": season,
+                        "folder": folder,
+                        "modified": item.get("modifiedTime"),
+                    }
+                    for item in items
+                    if "video" in item.get("mimeType", "")
+                ]
             else:
-                logger.warning(
-                    f"URL 验证失败 (状态码: {response.status_code if response else 'None'}): {url[:100]}..."
+                # 指定刷新重新列出全部番剧文件夹，不按快照跳过
+                crawler = AniCrawler(
+                    list_folder=self._client.list_folder,
+                    iter_folder=self._client.iter_folder,
+                    max_workers=self._crawl_workers,
+                    season_workers=self._crawl_workers,
                 )
-                return False
-        except Exception as e:
-            logger.warning(f"URL 验证异常: {str(e)[:100]}")
-            return False
+                for batch in crawler.iter_crawl([season]):
+                    # ANi目录下只处理番剧文件夹
+                    files.extend(
+                        file for file in batch if season != "ANi" or file.get("folder")
+                    )
 
-    def __touch_strm_file(
-        self, file_name, season: str = None, folder: str = None
-    ) -> bool:
-        """创建strm文件，按照年份季度/番剧名称/文件名.strm的目录结构"""
-        # 检查是否已处理过
-        # 只有在未勾选"覆盖本地已有文件"且不是全量下载模式时，才跳过已处理记录
-        if not self._overwrite_existing and file_name in self._processed_files:
-            logger.debug(f"{file_name} 已在处理记录中，跳过")
-            return False
+            self._metrics.add_phase("list", time.monotonic() - list_started)
+            write_started = time.monotonic()
+            created = 0
+            failed = set()
+            for file_info in files:
+                touched = self.__touch_strm_file(
+                    file_name=file_info["name"],
+                    season=file_info["season"],
+                    folder=file_info.get("folder"),
+                    modified=file_info.get("modified"),
+                )
+                if touched:
+                    created += 1
+                elif touched is None:
+                    failed.add(f'{file_info["season"]}/{file_info.get("folder")}')
+            self._writer.flush()
+            self._store.commit()
+            self._metrics.add_phase("write", time.monotonic() - write_started)
+            if not folder:
+                # 刷新结果同步到快照，写入失败的番剧文件夹下次运行重新处理
+                updated = {
+                    key: snapshot
+                    for key, snapshot in crawler.updated_snapshots.items()
+                    if key not in failed
+                }
+                if updated:
+                    snapshots = self.get_data("folder_snapshots") or {}
+                    snapshots.update(updated)
+                    self.save_data("folder_snapshots", snapshots)
+            result = {
+                "target": target,
+                "files": len(files),
+                "created": created,
+                "skipped": len(files) - created,
+                "elapsed": round(time.monotonic() - started, 2),
+            }
+            self._metrics.files = len(files)
+            self._metrics.created = created
+            self.__save_metrics("completed")
+            logger.info(
+                f"刷新 {target} 完成：获取 {result['files']} 个文件，新创建 {created} 个，"
+                f"跳过 {result['skipped']} 个，耗时 {result['elapsed']} 秒"
+            )
+            return result
+        finally:
+            if self._metrics is not None:
+                self.__discard_metrics()
+            self.__queue_library_refresh()
+            self._task_lock.release()
+
+    def __prepare_local(self, seasons: List[str]):
+        """只扫描指定季度的本地目录，准备写入"""
+        started = time.monotonic()
+        self._local_index = LocalIndex(self._storageplace)
+        for season in set(seasons):
+            index = LocalIndex(
+                os.path.join(self._storageplace, season),
+                parallel=self._parallel_scan,
+                workers=self._crawl_workers,
+            )
+            index.scan()
+            self._local_index.files |= index.files
+            self._local_index.dirs |= index.dirs
+        self._writer = StrmWriter(fsync=self._fsync)
+        self._writer.known_dirs(self._local_index.dirs)
+        if self._metrics:
+            self._metrics.add_phase("scan", time.monotonic() - started)
+
+    def __observe(self, batch: List[Dict]):
+        """记录剧集修改时间，更新放送轮询计划"""
+        if self._planner is None:
+            return
+        releases: Dict[str, List[Optional[str]]] = {}
+        for file_info in batch:
+            if file_info.get("folder"):
+                key = f'{file_info["season"]}/{file_info["folder"]}'
+                releases.setdefault(key, []).append(file_info.get("modified"))
+        for key, modified in releases.items():
+            self._planner.observe(key, modified)
+
+    def __poll_task(self):
+        """
+        放送轮询：列出当前季度根目录发现新番，按计划只刷新到期的番剧文件夹
+        全量下载或ANi目录同步开关打开时先执行一次完整任务
+        """
+        if self._full_download or self._sync_ani_dir:
+            self.__task()
+        if self._planner is None or not self._storageplace:
+            return
+        if not self._task_lock.acquire(blocking=False):
+            logger.info("ANi-Strm任务正在运行中，跳过本次轮询")
+            return
+        try:
+            started = time.monotonic()
+            self.__start_metrics("poll")
+            now = time.time()
+            season = self.__get_ani_season()
+            keys = self._planner.due(now)
+            root_files = []
+            if self._planner.root_due(season, now):
+                items = self.__list_folder(season)
+                if items is not None:
+                    self._planner.root_polled(season, now)
+                    for item in items:
+                        if item.get("mimeType") == FOLDER_MIME_TYPE:
+                            key = f'{season}/{item.get("name")}'
+                            if key not in self._planner and key not in keys:
+                                logger.info(f"发现新番剧文件夹: {key}")
+                                keys.append(key)
+                        elif "video" in item.get("mimeType", ""):
+                            root_files.append({"name": item.get("name"), "season": season})
+            if not keys and not root_files:
+                return
+
+            # 有待处理的番剧时才计入剖析次数
+            with self.__profiling("poll"):
+                self.__prepare_local([key.split("/", 1)[0] for key in keys] + [season])
+                total = len(root_files)
+                created = self.__touch_batch(root_files) if root_files else 0
+                list_started = time.monotonic()
+
+                def list_key(key: str) -> Tuple[str, Optional[List[dict]]]:
+                    return key, self.__list_folder(key)
+
+                with ThreadPoolExecutor(
+                    max_workers=self._crawl_workers, thread_name_prefix="anistrm-run-poll"
+                ) as pool:
+                    for key, items in pool.map(list_key, keys):
+                        if items is None:
+                            # 失败的番剧文件夹按原计划稍后重试
+                            self._planner.polled(key)
+                            continue
+                        folder_season, folder = key.split("/", 1)
+                        batch = [
+                            {
+                                "name": item["name"],
+                                "season": folder_season,
+                                "folder": folder,
+                                "modified": item.get("modifiedTime"),
+                            }
+                            for item in items
+                            if "video" in item.get("mimeType", "")
+                        ]
+                        total += len(batch)
+                        created += self.__touch_batch(batch)
+                        if not batch:
+                            self._planner.observe(key, [])
+
+                self._writer.flush()
+                self._store.commit()
+                pruned = self._planner.prune()
+                self.save_data("poll_plan", self._planner.to_dict())
+                self._metrics.add_phase(
+                    "list",
+                    time.monotonic() - list_started - self._metrics.phases.get("write", 0.0),
+                )
+                self._metrics.files = total
+                self._metrics.created = created
+                self.__save_metrics("completed")
+                logger.info(
+                    f"放送轮询完成：轮询 {len(keys)} 个番剧文件夹，新创建 {created} 个strm文件，"
+                    f"移出计划 {len(pruned)} 个，当前分层 {self._planner.tiers()}，"
+                    f"耗时 {time.monotonic() - started:.1f} 秒"
+                )
+        finally:
+            if self._metrics is not None:
+                self.__discard_metrics()
+            self.__queue_library_refresh()
+            self._task_lock.release()
+
+    def api_refresh(self, season: str = None, folder: str = None) -> schemas.Response:
+        """刷新指定季度或番剧文件夹"""
+        result = self.refresh(season=season, folder=folder)
+        if result is None:
+            return schemas.Response(success=False, message="任务正在运行中或未配置存储地址")
+        if result.get("error"):
+            return schemas.Response(success=False, message=result["error"], data=result)
+        return schemas.Response(
+            success=True,
+            message=f'新创建 {result["created"]} 个，跳过 {result["skipped"]} 个',
+            data=result,
+        )
+
+    @eventmanager.register(EventType.PluginAction)
+    def remote_refresh(self, event: Event):
+        """
+        远程命令刷新：/anistrm_refresh [季度[/番剧文件夹]]，如 /anistrm_refresh 2024-10/葬送的芙莉蓮
+        """
+        if not event or self._client is None:
+            return
+        event_data = event.event_data or {}
+        if event_data.get("action") != "anistrm_refresh":
+            return
+        season, _, folder = (event_data.get("arg_str") or "").strip().partition("/")
+        result = self.refresh(season=season, folder=folder)
+        if result is None:
+            text = "任务正在运行中或未配置存储地址"
+        elif result.get("error"):
+            text = f'{result["target"]}：{result["error"]}'
+        else:
+            text = (
+                f'{result["target"]}：获取 {result["files"]} 个文件，'
+                f'新创建 {result["created"]} 个，跳过 {result["skipped"]} 个'
+            )
+        self.post_message(
+            channel=event_data.get("channel"),
+            title="ANi-Strm 刷新完成" if result and not result.get("error") else "ANi-Strm 刷新失败",
+            text=text,
+            userid=event_data.get("user"),
+        )
 
+    def __strm_path(self, file_name: str, season: str = None) -> Tuple[str, str, str, str]:
+        """
+        strm文件位置：存储地址/年份季度/番剧名称/文件名.strm
+        :return: (季度, 番剧名称, 目录, 文件路径)
+        """
         # 使用传入的season参数，如果没有则使用self._date
         use_season = season if season else self._date
 
         # 从文件名中提取番剧名称（去除集数信息）
         # 例如：[ANi] 葬送的芙莉蓮 - 02 [1080P][Baha][WEB-DL][AAC AVC][CHT]
         # 提取：葬送的芙莉蓮
-        anime_name = self.__extract_anime_name(file_name)
+        anime_name = extract_anime_name(file_name)
 
         # 构建目录路径：存储地址/年份季度/番剧名称/
         dir_path = os.path.join(self._storageplace, use_season, anime_name)
 
         # 构建完整文件路径
         file_path = os.path.join(dir_path, f"{file_name}.strm")
+        return use_season, anime_name, dir_path, file_path
 
-        if os.path.exists(file_path):
-            logger.debug(f"{file_name}.strm 文件已存在，跳过")
-            # 添加到处理记录
-            self._processed_files[file_name] = {
-                "season": season,
-                "anime_name": anime_name,
-                "created_at": datetime.now().isoformat(),
+    def reconcile(
+        self, dry_run: bool = True, quarantine: bool = None, seasons: List[str] = None
+    ) -> Optional[dict]:
+        """
+        清理上游已删除或改名的剧集：重新列出有处理记录的季度，与本地strm文件做集合差，
+        删除或隔离插件创建的孤立文件，删除空的番剧目录并清理处理记录
+        只处理完整列出的季度，列出失败的季度不做任何删除
+        :param dry_run: 只生成报告，不修改文件与记录
+        :param quarantine: 移入隔离目录而不是删除，默认按"隔离失效strm文件"配置
+        :param seasons: 指定季度，默认为所有有处理记录的季度
+        """
+        if not self._storageplace:
+            return None
+        if not self._task_lock.acquire(blocking=False):
+            logger.info("ANi-Strm任务正在运行中，跳过本次清理")
+            return None
+        try:
+            started = time.monotonic()
+            quarantine = self._quarantine_dead if quarantine is None else quarantine
+            seasons = sorted(seasons or self._store.seasons())
+            logger.info(f"开始清理上游已删除的文件{'（预览）' if dry_run else ''}：{seasons}")
+
+            # 不使用快照与封存，完整列出上游
+            crawler = AniCrawler(
+                list_folder=self._client.list_folder,
+                iter_folder=self._client.iter_folder,
+                max_workers=self._crawl_workers,
+                season_workers=self._season_workers,
+            )
+            expected = set()
+            upstream = set()
+            for batch in crawler.iter_crawl(seasons):
+                for file_info in batch:
+                    if file_info["season"] == "ANi" and not file_info.get("folder"):
+                        continue
+                    upstream.add(file_info["name"])
+                    expected.add(self.__strm_path(file_info["name"], file_info["season"])[3])
+            complete = [
+                season
+                for season in seasons
+                if (crawler.updated_seasons.get(season) or {}).get("complete")
+            ]
+            incomplete = sorted(set(seasons) - set(complete))
+            if incomplete:
+                logger.warning(f"以下季度未能完整列出，跳过清理: {incomplete}")
+
+            local = set()
+            managed = set()
+            stale_records = []
+            for season in complete:
+                index = LocalIndex(
+                    os.path.join(self._storageplace, season),
+                    parallel=self._parallel_scan,
+                    workers=self._crawl_workers,
+                )
+                index.scan()
+                local |= index.files
+                names = self._store.by_season(season)
+                managed.update(names)
+                stale_records.extend(name for name in names if name not in upstream)
+            orphans, unmanaged = diff_local(expected, local, managed)
+
+            removed = []
+            pruned = 0
+            if not dry_run:
+                if quarantine:
+                    removed = LinkProber.quarantine(
+                        orphans, self._storageplace, self.get_data_path() / "quarantine"
+                    )
+                else:
+                    removed = remove_files(orphans)
+                # 隔离时返回的是隔离目录中的路径，按原路径判断是否已移除
+                gone = [f for f in orphans if not os.path.exists(f)]
+                if self._journal:
+                    self._journal.extend(DELETE, gone, reason="reconcile")
+                # strm旁的元数据随之删除，使空目录可以清理
+                remove_sidecars(gone)
+                pruned = prune_empty_dirs(orphans, self._storageplace)
+                self._store.delete(stale_records)
+
+            report = {
+                "checked_at": datetime.now().isoformat(),
+                "dry_run": dry_run,
+                "seasons": complete,
+                "incomplete": incomplete,
+                "upstream": len(upstream),
+                "local": len(local),
+                "orphans": len(orphans),
+                "removed": len(removed),
+                "quarantined": quarantine and not dry_run,
+                "pruned_dirs": pruned,
+                "stale_records": len(stale_records),
+                "unmanaged": len(unmanaged),
+                "orphan_files": orphans[:200],
+                "unmanaged_files": unmanaged[:200],
+                "elapsed": round(time.monotonic() - started, 2),
             }
-            return False
-
-        # 季度API生成的URL，根据文件后缀动态生成
-        # 直接截取最后一个点号后的扩展名
-        if "." in file_name:
-            # 找到最后一个点的位置
-            last_dot_index = file_name.rfind(".")
-            file_ext = file_name[last_dot_index + 1 :]  # 扩展名（不含点号）
-            clean_name = file_name[:last_dot_index]  # 去掉扩展名的文件名
-        else:
-            # 没有扩展名，默认使用 mp4
-            file_ext = "mp4"
-            clean_name = file_name
-
-        # 构建URL，如果有二级目录（folder），需要加上
-        encoded_filename = quote(clean_name, safe="")
-        if folder:
-            # 有二级目录：season/folder/filename?d=ext
-            encoded_folder = quote(folder, safe="")
-            src_url = f"https://openani.an-i.workers.dev/{use_season}/{encoded_folder}/{encoded_filename}.{file_ext}?d=true"
-        else:
-            # 没有二级目录：season/filename?d=ext
-            src_url = f"https://openani.an-i.workers.dev/{use_season}/{encoded_filename}.{file_ext}?d=true"
+            self.save_data("reconcile_report", report)
+            logger.info(
+                f"清理{'预览' if dry_run else ''}完成：上游 {len(upstream)} 个文件，本地 {len(local)} 个，"
+                f"孤立 {len(orphans)} 个，已{'隔离' if quarantine else '删除'} {len(removed)} 个，"
+                f"删除空目录 {pruned} 个，过期记录 {len(stale_records)} 条，"
+                f"非插件创建 {len(unmanaged)} 个（不处理），耗时 {report['elapsed']} 秒"
+            )
+            return report
+        finally:
+            self._task_lock.release()
+
+    def api_reconcile(
+        self, dry_run: bool = True, quarantine: bool = False, season: str = None
+    ) -> schemas.Response:
+        """后台运行清理，返回上次清理报告"""
+        seasons = [s.strip() for s in season.split(",") if s.strip()] if season else None
+        threading.Thread(
+            target=self.reconcile,
+            kwargs={"dry_run": dry_run, "quarantine": quarantine, "seasons": seasons},
+            daemon=True,
+        ).start()
+        return schemas.Response(
+            success=True,
+            message="预览清理已开始" if dry_run else "清理已开始",
+            data=self.get_data("reconcile_report"),
+        )
 
-        try:
-            # 创建目录（如果不存在）
-            os.makedirs(dir_path, exist_ok=True)
+    def __touch_strm_file(
+        self, file_name, season: str = None, folder: str = None, modified: str = None
+    ) -> Optional[bool]:
+        """
+        创建strm文件，按照年份季度/番剧名称/文件名.strm的目录结构
+        覆盖模式下重新写入本地已有的文件
+        :return: 新创建或覆盖返回True，已存在返回False，写入失败返回None
+        """
+        # 检查是否已处理过
+        # 只有在未勾选"覆盖本地已有文件"且不是全量下载模式时，才跳过已处理记录
+        if not self._overwrite_existing and file_name in self._store:
+            logger.debug(f"{file_name} 已在处理记录中，跳过")
+            return False
 
-            # 创建strm文件
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write(src_url)
+        use_season, anime_name, dir_path, file_path = self.__strm_path(
+            file_name, season
+        )
 
-            # 验证文件是否创建成功
-            if not os.path.exists(file_path):
-                logger.error(f"strm 文件创建失败: {file_path}")
-                return False
+        existed = file_path in self._local_index
+        if existed and not self._overwrite_existing:
+            logger.debug(f"{file_name}.strm 文件已存在，跳过")
+            # 添加到处理记录
+            self._store.upsert(
+                ProcessedRecord(file_name, season, anime_name, folder)
+            )
+            return False
 
-            # 验证文件内容
-            with open(file_path, "r", encoding="utf-8") as file:
-                content = file.read().strip()
-                if content != src_url:
-                    logger.error(f"strm 文件内容验证失败: {file_path}")
-                    return False
+        # 季度API生成的URL，根据文件后缀动态生成，有二级目录（folder）时需要加上
+        src_url = build_strm_url(self._strm_base, use_season, file_name, folder)
 
-            # 验证文件权限（确保可读）
-            if not os.access(file_path, os.R_OK):
-                logger.warning(f"strm 文件权限不足，尝试修改: {file_path}")
-                os.chmod(file_path, 0o644)
+        try:
+            # 原子写入strm文件，目录按需创建
+            self._writer.write(dir_path, file_path, src_url)
+            self._local_index.add(file_path)
+            self._touched_dirs.add(dir_path)
+            if self._journal:
+                self._journal.append(
+                    OVERWRITE if existed else CREATE,
+                    file_path,
+                    season=use_season,
+                    name=file_name,
+                )
+            if self._write_nfo:
+                self.__write_nfo(use_season, anime_name, dir_path, file_path, modified)
 
-            logger.debug(f"创建 {use_season}/{anime_name}/{file_name}.strm 文件成功")
+            logger.debug(
+                f'{"覆盖" if existed else "创建"} {use_season}/{anime_name}/{file_name}.strm 文件成功'
+            )
 
             # 添加到处理记录
-            self._processed_files[file_name] = {
-                "season": season,
-                "anime_name": anime_name,
-                "created_at": datetime.now().isoformat(),
-                "url": src_url,
-            }
+            self._store.upsert(
+                ProcessedRecord(file_name, season, anime_name, folder)
+            )
             return True
         except Exception as e:
             logger.error(f"创建strm源文件失败：{str(e)}")
-            return False
-
-    def __extract_anime_name(self, file_name: str) -> str:
-        """从文件名中提取番剧名称"""
-        # 移除常见的标签和集数信息
-        # 例如：[ANi] 葬送的芙莉蓮 - 02 [1080P][Baha][WEB-DL][AAC AVC][CHT]
-        # 提取：葬送的芙莉蓮
-
-        import re
-
-        # 移除开头的标签 [ANi] 等
-        name = re.sub(r"^\[.*?\]\s*", "", file_name)
-
-        # 提取 " - " 之前的部分作为番剧名称
-        if " - " in name:
-            name = name.split(" - ")[0].strip()
+            return None
+
+    def __write_nfo(
+        self,
+        season: str,
+        anime_name: str,
+        dir_path: str,
+        file_path: str,
+        modified: str = None,
+    ):
+        """
+        在strm旁写入剧集元数据，每个番剧目录只写入一次番剧元数据，已有的不覆盖
+        元数据写入失败不影响strm文件
+        """
+        try:
+            content = episode_nfo(os.path.basename(file_path)[: -len(".strm")], modified)
+            if content:
+                self._writer.write(dir_path, sidecar_path(file_path), content)
+            if dir_path not in self._nfo_dirs:
+                self._nfo_dirs.add(dir_path)
+                tvshow_path = os.path.join(dir_path, TVSHOW_NFO)
+                if not os.path.exists(tvshow_path):
+                    self._writer.write(dir_path, tvshow_path, tvshow_nfo(anime_name, season))
+        except Exception as e:
+            logger.error(f"写入元数据文件失败：{str(e)}")
+
+    def __touch_batch(self, batch: List[Dict]) -> int:
+        """处理一批剧集文件，返回新创建的数量"""
+        started = time.monotonic()
+        self.__observe(batch)
+        if self._episode_index is not None:
+            # 写入前丢弃其它来源中已有的剧集
+            batch = self._episode_index.filter(batch)
+        cnt = 0
+        for file_info in batch:
+            created = self.__touch_strm_file(
+                file_name=file_info["name"],
+                season=file_info["season"],
+                folder=file_info.get("folder"),
+                modified=file_info.get("modified"),
+            )
+            if created:
+                cnt += 1
+            elif created is None:
+                # 写入失败的番剧文件夹与季度不记入快照，下次运行重新处理
+                self._write_failures.add(file_info["season"])
+                if file_info.get("folder"):
+                    self._write_failures.add(f'{file_info["season"]}/{file_info["folder"]}')
+        self._run_created += cnt
+        if self._metrics:
+            self._metrics.add_phase("write", time.monotonic() - started)
+        return cnt
+
+    def __queue_library_refresh(self):
+        """
+        本次运行写入strm的目录加入待刷新队列，队列保存在插件数据中，
+        防抖窗口从队列中最早的目录开始计算，窗口内后续运行的目录合并到同一次刷新
+        """
+        dirs, self._touched_dirs = self._touched_dirs, set()
+        if not dirs or not self._refresher:
+            return
+        with self._refresh_lock:
+            pending = self.get_data("pending_refresh") or {}
+            since = pending.get("since") or time.time()
+            paths = set(pending.get("paths") or []) | dirs
+            self.save_data("pending_refresh", {"since": since, "paths": sorted(paths)})
+        logger.info(f"{len(dirs)} 个目录加入媒体库刷新队列，共 {len(paths)} 个待刷新")
+        self.__schedule_library_refresh(since)
+
+    def __schedule_library_refresh(self, since: float):
+        """在防抖窗口结束时刷新，重复安排时保持原有时间"""
+        if not self._scheduler:
+            self._scheduler = BackgroundScheduler(timezone=settings.TZ)
+        run_at = max(since + self._refresh_debounce * 60, time.time() + 1)
+        self._scheduler.add_job(
+            func=self.flush_library_refresh,
+            trigger="date",
+            run_date=datetime.fromtimestamp(run_at, tz=pytz.timezone(settings.TZ)),
+            id="anistrm_library_refresh",
+            replace_existing=True,
+            name="ANiStrm媒体库刷新",
+        )
+        if not self._scheduler.running:
+            self._scheduler.start()
 
-        # 移除可能的尾部标签
-        name = re.sub(r"\[.*?\]", "", name).strip()
+    def flush_library_refresh(self) -> Optional[dict]:
+        """
+        立即刷新队列中的目录，失败的目录留在队列中等待下一个窗口
+        :return: 刷新结果，未启用时返回None
+        """
+        if not self._refresher:
+            return None
+        with self._refresh_lock:
+            pending = self.get_data("pending_refresh") or {}
+            paths = pending.get("paths") or []
+            if not paths:
+                return {"refreshed": 0, "failed": 0}
+            failed = self._refresher.refresh(paths)
+            if failed:
+                self.save_data(
+                    "pending_refresh", {"since": time.time(), "paths": failed}
+                )
+            else:
+                self.del_data("pending_refresh")
+        if failed:
+            self.__schedule_library_refresh(time.time())
+        return {"refreshed": len(paths) - len(failed), "failed": len(failed)}
+
+    def get_changes(self, since: int = 0, limit: int = 1000) -> schemas.Response:
+        """序号大于since的strm文件变更"""
+        if not self._journal:
+            return schemas.Response(success=False, message="未启用变更日志")
+        return schemas.Response(
+            success=True, data=self._journal.since(int(since or 0), int(limit or 1000))
+        )
 
-        # 如果提取失败，使用原文件名
-        if not name:
-            name = file_name
+    def api_library_refresh(self) -> schemas.Response:
+        """立即刷新队列中的目录，不等待合并窗口"""
+        result = self.flush_library_refresh()
+        if result is None:
+            return schemas.Response(success=False, message="未启用媒体库刷新")
+        return schemas.Response(success=not result["failed"], data=result)
 
-        return name
+    def __profiling(self, label: str):
+        """
+        剖析接下来的若干次运行，报告写入插件数据目录；未开启时不做任何处理
+        """
+        if self._profile_runs <= 0:
+            return nullcontext()
+        self._profile_runs -= 1
+        self.__update_config()
+        return RunProfiler(
+            self.get_data_path() / "profiles", label=label, keep=self._profile_keep
+        )
 
     def __task(self):
-        """统一的增量处理任务"""
+        """统一的增量处理任务，与指定刷新互斥"""
+        if not self._task_lock.acquire(blocking=False):
+            logger.info("ANi-Strm任务正在运行中，跳过本次执行")
+            return
+        try:
+            with self.__profiling("task"):
+                self.__run_task()
+        finally:
+            self._episode_index = None
+            self.__queue_library_refresh()
+            self._task_lock.release()
+
+    def __run_task(self):
+        """抓取并创建strm文件"""
         # 验证存储路径
         if not self._storageplace:
             logger.error("未配置Strm存储地址，任务终止")
             return
 
         cnt = 0
+        total = 0
+        stopped = False
+        self._run_started = self._last_checkpoint = time.monotonic()
+        self._run_requests_base = self._client.requests
+        self._run_created = 0
+        self.__start_metrics("full" if self._full_download else "current")
 
         # 初始化当前季度
         self.__get_ani_season()
-
-        # 获取所有季度的番剧列表
-        all_files = self.get_all_seasons_list()
+        self.__load_checkpoint()
+
+        # 加载番剧文件夹快照
+        self._folder_snapshots = self.get_data("folder_snapshots") or {}
+        self._pending_snapshots = {}
+        self._season_index = self.get_data("season_index") or {}
+        self._pending_seasons = {}
+
+        # 同步ANi目录时建立跨来源去重索引
+        self._episode_index = None
+        if self._sync_ani_dir and self._ani_dedup:
+            self.__build_episode_index()
+
+        # 扫描一次本地目录，后续以索引判断文件是否存在
+        scan_started = time.monotonic()
+        self._local_index = LocalIndex(
+            self._storageplace,
+            parallel=self._parallel_scan,
+            workers=self._crawl_workers,
+        )
+        self._local_index.scan()
+        self._writer = StrmWriter(fsync=self._fsync)
+        self._writer.known_dirs(self._local_index.dirs)
+        self._metrics.add_phase("scan", time.monotonic() - scan_started)
+        stream_started = time.monotonic()
+
+        # 流式获取所有季度的番剧列表，每个番剧文件夹列出后立即创建strm
+        with closing(self.iter_all_seasons_list()) as batches:
+            for batch in batches:
+                total += len(batch)
+                cnt += self.__touch_batch(batch)
+                if self.__budget_exhausted():
+                    stopped = True
+                    break
         if self._full_download:
-            logger.info(
-                f"全量下载模式：从开始年份季度到当前，共获取 {len(all_files)} 个番剧文件"
-            )
+            logger.info(f"全量下载模式：从开始年份季度到当前，共获取 {total} 个番剧文件")
         else:
-            logger.info(f"当前季度模式：共获取 {len(all_files)} 个番剧文件")
+            logger.info(f"当前季度模式：共获取 {total} 个番剧文件")
 
-        if self._sync_ani_dir:
+        if self._sync_ani_dir and not stopped:
             logger.info("ANi目录同步已开启，开始获取番剧列表...")
-            ani_files = self.get_ani_list()
-            all_files.extend(ani_files)
-            logger.info(f"ANi目录同步完成，共获取 {len(ani_files)} 个番剧文件")
-            self._sync_ani_dir = False
-
-        # 处理每个文件
-        for file_info in all_files:
-            if self.__touch_strm_file(
-                file_name=file_info["name"],
-                season=file_info["season"],
-                folder=file_info.get("folder"),
-            ):
-                cnt += 1
+            ani_total = 0
+            with closing(self.iter_ani_list()) as batches:
+                for batch in batches:
+                    ani_total += len(batch)
+                    cnt += self.__touch_batch(batch)
+                    if self.__budget_exhausted():
+                        stopped = True
+                        break
+            logger.info(f"ANi目录同步完成，共获取 {ani_total} 个番剧文件")
+            if self._episode_index is not None:
+                logger.info(f"跨来源去重：跳过 {self._episode_index.duplicates} 个重复剧集")
+            if not stopped:
+                self._sync_ani_dir = False
+            total += ani_total
+
+        # 抓取与写入重叠进行，等待抓取的时间计为目录抓取耗时
+        self._metrics.add_phase(
+            "list",
+            time.monotonic() - stream_started - self._metrics.phases.get("write", 0.0),
+        )
+        self._metrics.files = total
+        self._metrics.created = cnt
+
+        if stopped:
+            # 预算用完：保存断点，保留全量下载等开关，下次运行继续
+            self.__save_checkpoint()
+            self._pending_seasons = {}
+            self.__update_config()
+            self.__save_metrics("budget")
+            logger.info(
+                "本次运行预算已用完，已保存断点，下次运行继续。"
+                f"本次新创建了 {cnt} 个strm文件，已处理记录总数: {len(self._store)}"
+            )
+            return
+
+        self._writer.flush()
+        self.del_data("checkpoint")
+
+        # 文件处理完成后再保存快照，避免中途失败导致漏建
+        if self._pending_snapshots:
+            self._folder_snapshots.update(self._pending_snapshots)
+            self.save_data("folder_snapshots", self._folder_snapshots)
+            self._pending_snapshots = {}
+        if self._pending_seasons:
+            self.__update_season_index()
+            self.save_data("season_index", self._season_index)
+        if self._planner is not None:
+            self._planner.prune()
+            self.save_data("poll_plan", self._planner.to_dict())
 
         # 如果是全量下载模式，执行完成后关闭
         if self._full_download:
@@ -653,21 +1499,128 @@ class ANiStrmNew(_PluginBase):
             logger.info("下载任务执行完成，关闭覆盖本地已有文件开关")
             self._overwrite_existing = False
         # 保存处理记录
+        self._store.commit()
         self.__update_config()
+        self.__save_metrics("completed")
+
+        logger.info(
+            f"本次新创建了 {cnt} 个strm文件，已处理记录总数: {len(self._store)}"
+        )
 
+    def __start_metrics(self, mode: str):
+        """
+        开始本次运行的指标统计
+        :param mode: 运行模式，见 RUN_MODES
+        """
+        self._metrics = RunMetrics(mode=mode)
+        self._client.metrics = self._metrics
+        self._metrics_base = (self._client.retries, self._client.hedges)
+
+    def __discard_metrics(self):
+        """丢弃未保存的指标统计，如轮询无到期番剧或运行出错"""
+        self._client.metrics = None
+        self._metrics = None
+
+    def __save_metrics(self, status: str):
+        """结束本次运行的指标统计，保存到运行历史"""
+        self._client.metrics = None
+        self._metrics.retries = self._client.retries - self._metrics_base[0]
+        self._metrics.hedges = self._client.hedges - self._metrics_base[1]
+        self._metrics.endpoints = self._client.pool.to_list()
+        self._metrics.finish(status)
+        run = self._metrics.to_dict()
+        self._metrics = None
+        history = self.get_data("run_metrics") or []
+        history.append(run)
+        self.save_data("run_metrics", history[-self._metrics_history :])
+        latency = run["latency"]
         logger.info(
-            f"本次新创建了 {cnt} 个strm文件，已处理记录总数: {len(self._processed_files)}"
+            f"运行指标：耗时 {run['elapsed']} 秒（{run['phases']}），请求 {run['requests']} 次，"
+            f"失败 {run['errors']} 次，重试 {run['retries']} 次，流量 {run['bytes'] / 1024:.0f} KB，"
+            f"请求耗时 p50/p95/p99 {latency['p50']}/{latency['p95']}/{latency['p99']} ms"
         )
 
+    def get_metrics(self, limit: int = 0) -> schemas.Response:
+        """最近的运行指标，最新的在前"""
+        history = list(reversed(self.get_data("run_metrics") or []))
+        if limit:
+            history = history[: int(limit)]
+        return schemas.Response(success=True, data=history)
+
     def get_state(self) -> bool:
         return self._enabled
 
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "cmd": "/anistrm_refresh",
+                "event": EventType.PluginAction,
+                "desc": "ANi-Strm刷新季度或番剧",
+                "category": "",
+                "data": {"action": "anistrm_refresh"},
+            }
+        ]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/unseal_season",
+                "endpoint": self.unseal_season,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "解封季度",
+                "description": "解封已封存的季度，多个季度用逗号分隔，all 表示全部",
+            },
+            {
+                "path": "/validate_links",
+                "endpoint": self.api_validate_links,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "检测失效链接",
+                "description": "后台检测本地strm文件中的链接，quarantine=true 时隔离失效文件，返回上次检测报告",
+            },
+            {
+                "path": "/refresh",
+                "endpoint": self.api_refresh,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "刷新季度或番剧",
+                "description": "立即刷新指定季度（season，如 2024-10 或 ANi，默认当前季度）或其中的番剧文件夹（folder），返回新创建与跳过的数量",
+            },
+            {
+                "path": "/reconcile",
+                "endpoint": self.api_reconcile,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "清理上游已删除的文件",
+                "description": "后台重新列出有记录的季度（season 可指定，逗号分隔），dry_run=false 时删除孤立的strm文件、空目录与过期记录，quarantine=true 时移入隔离目录，返回上次清理报告",
+            },
+            {
+                "path": "/changes",
+                "endpoint": self.get_changes,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "strm文件变更",
+                "description": "返回序号大于 since 的创建、覆盖与删除记录（最多 limit 条），next 为下次请求使用的序号，reset 为 true 时请求的序号已超出保留范围，需要全量扫描一次",
+            },
+            {
+                "path": "/library_refresh",
+                "endpoint": self.api_library_refresh,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "立即刷新媒体库",
+                "description": "不等待合并窗口，立即通知媒体服务器刷新队列中的目录，返回成功与失败的目录数",
+            },
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "运行指标",
+                "description": "最近运行的耗时、请求数、流量、失败与重试次数、请求耗时分位数及各季度耗时，limit 限制返回条数",
+            },
+        ]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -750,17 +1703,160 @@ class ANiStrmNew(_PluginBase):
                                     }
                                 ],
                             },
-                        ],
-                    },
-                    {
-                        "component": "VRow",
-                        "content": [
                             {
                                 "component": "VCol",
                                 "props": {"cols": 12, "md": 4},
                                 "content": [
                                     {
-                                        "component": "VTextField",
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "incremental",
+                                            "label": "增量抓取",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "fsync",
+                                            "label": "写入后确保落盘",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "parallel_scan",
+                                            "label": "并发扫描本地目录",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "validate_links",
+                                            "label": "检测失效链接",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "quarantine_dead",
+                                            "label": "隔离失效strm文件",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "reconcile",
+                                            "label": "清理上游已删除的文件",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "reconcile_dry_run",
+                                            "label": "清理仅预览",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "adaptive_schedule",
+                                            "label": "按放送时间轮询",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "ani_dedup",
+                                            "label": "ANi目录跳过季度中已有番剧",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "write_nfo",
+                                            "label": "生成nfo元数据",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "change_journal",
+                                            "label": "记录文件变更日志",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
                                         "props": {
                                             "model": "cron",
                                             "label": "执行周期",
@@ -783,6 +1879,259 @@ class ANiStrmNew(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "crawl_workers",
+                                            "label": "抓取并发数",
+                                            "placeholder": "8",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "season_workers",
+                                            "label": "单季度并发数",
+                                            "placeholder": "4",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "pool_size",
+                                            "label": "连接池大小",
+                                            "placeholder": "8",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "timeout",
+                                            "label": "请求超时(秒)",
+                                            "placeholder": "20",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "rate_limit",
+                                            "label": "最大请求速率(次/秒)",
+                                            "placeholder": "10，0为不限速",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_retries",
+                                            "label": "单请求重试次数",
+                                            "placeholder": "3",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_requests",
+                                            "label": "单次运行最大请求数",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_minutes",
+                                            "label": "单次运行最长时间(分钟)",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "probe_workers",
+                                            "label": "链接探测并发数",
+                                            "placeholder": "16",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "link_cache_hours",
+                                            "label": "探测结果缓存(小时)",
+                                            "placeholder": "24",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "profile_runs",
+                                            "label": "剖析接下来的运行次数",
+                                            "placeholder": "0为关闭",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "profile_keep",
+                                            "label": "保留剖析报告数",
+                                            "placeholder": "10",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "snapshot_max_hours",
+                                            "label": "快照有效时间（小时）",
+                                            "placeholder": "24，0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "hot_minutes",
+                                            "label": "上线窗口内轮询间隔(分钟)",
+                                            "placeholder": "10",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "warm_hours",
+                                            "label": "连载中轮询间隔(小时)",
+                                            "placeholder": "3",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "cold_hours",
+                                            "label": "未更新番剧轮询间隔(小时)",
+                                            "placeholder": "168",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_pages",
+                                            "label": "单目录最多翻页数",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -822,6 +2171,160 @@ class ANiStrmNew(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "seal_runs",
+                                            "label": "封存所需未变化次数",
+                                            "placeholder": "3，0为不封存",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "unseal_seasons",
+                                            "label": "解封季度",
+                                            "placeholder": "2020-1,2020-4 或 all",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 6},
+                                "content": [
+                                    {
+                                        "component": "VTextarea",
+                                        "props": {
+                                            "model": "endpoints",
+                                            "label": "目录列表站点",
+                                            "rows": 2,
+                                            "placeholder": "镜像或反代地址，多个以换行或逗号分隔，为空时使用官方站点",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "strm_base",
+                                            "label": "strm播放地址站点",
+                                            "placeholder": OPENANI_BASE,
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "hedge_requests",
+                                            "label": "对冲请求",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 2},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "library_refresh",
+                                            "label": "通知媒体库刷新",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "mediaserver_host",
+                                            "label": "媒体服务器地址",
+                                            "placeholder": "http://127.0.0.1:8096",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "mediaserver_apikey",
+                                            "label": "媒体服务器API密钥",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "refresh_debounce",
+                                            "label": "刷新合并窗口(分钟)",
+                                            "placeholder": "5",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 12},
+                                "content": [
+                                    {
+                                        "component": "VTextarea",
+                                        "props": {
+                                            "model": "mediaserver_path_map",
+                                            "label": "媒体服务器路径映射",
+                                            "rows": 2,
+                                            "placeholder": "本地路径:媒体服务器路径，如 /downloads/strm:/media/strm，多个以换行分隔",
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -846,7 +2349,33 @@ class ANiStrmNew(_PluginBase):
                                             + "\n"
                                             + "全量下载执行完成后会自动关闭"
                                             + "\n"
-                                            + "勾选'覆盖本地已有文件'后，会跳过已处理记录，重新创建所有文件",
+                                            + "勾选'覆盖本地已有文件'后，会跳过已处理记录，重新创建所有文件"
+                                            + "\n"
+                                            + "开启'增量抓取'后，修改时间未变化的番剧文件夹不再重复获取"
+                                            + "\n"
+                                            + "一年前的季度连续多次全量下载未变化后会被封存，之后只校验一次季度目录"
+                                            + "\n"
+                                            + "设置单次运行预算后，达到最大请求数或最长时间时保存断点，下次运行继续"
+                                            + "\n"
+                                            + "开启'检测失效链接'后立即检测一次本地strm链接，只请求首字节，失效文件可隔离到插件数据目录"
+                                            + "\n"
+                                            + "开启'清理上游已删除的文件'后立即重新列出有记录的季度，删除或隔离上游已删除、改名的strm文件，开启'清理仅预览'时只生成报告"
+                                            + "\n"
+                                            + "开启'按放送时间轮询'后不再按执行周期全量抓取，根据每部番剧的更新规律只在预计上线时频繁检查"
+                                            + "\n"
+                                            + "开启'ANi目录跳过季度中已有番剧'后，同步ANi目录时不再列出季度目录中已有的番剧，并跳过标题、集数与版本相同的重复剧集"
+                                            + "\n"
+                                            + "配置多个目录列表站点后，请求发往延迟最低的健康站点，连续失败的站点暂停使用；开启'对冲请求'后，请求超过站点p95延迟未返回时向另一站点再发一次"
+                                            + "\n"
+                                            + "strm文件中的播放地址固定使用'strm播放地址站点'，不随目录列表站点切换"
+                                            + "\n"
+                                            + "开启'生成nfo元数据'后，在strm旁写入由文件名解析出的标题、季数与集数，每个番剧目录写入一次tvshow.nfo；nfo中没有TMDB等ID，媒体服务器与mp仍需识别番剧，但不必再从文件名解析剧集"
+                                            + "\n"
+                                            + "开启'记录文件变更日志'后，strm文件的创建、覆盖与删除按序号追加到插件数据目录下的日志中，下游可通过 /changes?since=序号 接口增量获取变更，不必扫描整个存储目录"
+                                            + "\n"
+                                            + "设置'剖析接下来的运行次数'后，接下来的定时运行会用 cProfile 与 tracemalloc 剖析，报告写入插件数据目录 profiles 下，每次运行后次数减一"
+                                            + "\n"
+                                            + "开启'通知媒体库刷新'后，新建strm的番剧目录通过Emby/Jellyfin的 /Library/Media/Updated 接口按目录刷新，合并窗口内多次运行的目录一次提交；存储路径与媒体服务器中的路径不同时需配置路径映射",
                                             "style": "white-space: pre-line;",
                                         },
                                     },
@@ -872,12 +2401,49 @@ class ANiStrmNew(_PluginBase):
             "onlyonce": False,
             "full_download": False,
             "sync_ani_dir": False,
+            "ani_dedup": True,
             "overwrite_existing": False,
+            "incremental": True,
+            "fsync": False,
+            "write_nfo": False,
+            "change_journal": False,
+            "profile_runs": 0,
+            "profile_keep": 10,
+            "parallel_scan": False,
             "storageplace": "/downloads/strm",
             "cron": "*/20 22,23,0,1 * * *",
             "start_year": 2019,
             "start_season": 1,
-            "processed_files": {},
+            "seal_runs": 3,
+            "snapshot_max_hours": 24,
+            "unseal_seasons": "",
+            "crawl_workers": 8,
+            "season_workers": 4,
+            "pool_size": 8,
+            "timeout": 20,
+            "rate_limit": 10,
+            "max_retries": 3,
+            "max_pages": 50,
+            "endpoints": "",
+            "strm_base": OPENANI_BASE,
+            "hedge_requests": False,
+            "library_refresh": False,
+            "mediaserver_host": "",
+            "mediaserver_apikey": "",
+            "mediaserver_path_map": "",
+            "refresh_debounce": 5,
+            "max_requests": 0,
+            "max_minutes": 0,
+            "validate_links": False,
+            "quarantine_dead": False,
+            "reconcile": False,
+            "reconcile_dry_run": True,
+            "probe_workers": 16,
+            "link_cache_hours": 24,
+            "adaptive_schedule": False,
+            "hot_minutes": 10,
+            "warm_hours": 3,
+            "cold_hours": 168,
         }
 
     def __update_config(self):
@@ -887,17 +2453,232 @@ class ANiStrmNew(_PluginBase):
                 "full_download": self._full_download,
                 "overwrite_existing": self._overwrite_existing,
                 "sync_ani_dir": self._sync_ani_dir,
+                "ani_dedup": self._ani_dedup,
+                "incremental": self._incremental,
+                "fsync": self._fsync,
+                "write_nfo": self._write_nfo,
+                "change_journal": self._change_journal,
+                "profile_runs": self._profile_runs,
+                "profile_keep": self._profile_keep,
+                "parallel_scan": self._parallel_scan,
                 "cron": self._cron,
                 "enabled": self._enabled,
                 "storageplace": self._storageplace,
                 "start_year": self._start_year,
                 "start_season": self._start_season,
-                "processed_files": self._processed_files,
+                "seal_runs": self._seal_runs,
+                "snapshot_max_hours": self._snapshot_max_hours,
+                "unseal_seasons": self._unseal_seasons,
+                "crawl_workers": self._crawl_workers,
+                "season_workers": self._season_workers,
+                "pool_size": self._pool_size,
+                "timeout": self._timeout,
+                "rate_limit": self._rate_limit,
+                "max_retries": self._max_retries,
+                "max_pages": self._max_pages,
+                "endpoints": self._endpoints,
+                "strm_base": self._strm_base,
+                "hedge_requests": self._hedge_requests,
+                "library_refresh": self._library_refresh,
+                "mediaserver_host": self._mediaserver_host,
+                "mediaserver_apikey": self._mediaserver_apikey,
+                "mediaserver_path_map": self._mediaserver_path_map,
+                "refresh_debounce": self._refresh_debounce,
+                "max_requests": self._max_requests,
+                "max_minutes": self._max_minutes,
+                "validate_links": self._validate_links,
+                "quarantine_dead": self._quarantine_dead,
+                "reconcile": self._reconcile,
+                "reconcile_dry_run": self._reconcile_dry_run,
+                "probe_workers": self._probe_workers,
+                "link_cache_hours": self._link_cache_hours,
+                "adaptive_schedule": self._adaptive_schedule,
+                "hot_minutes": self._hot_minutes,
+                "warm_hours": self._warm_hours,
+                "cold_hours": self._cold_hours,
             }
         )
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        拼装插件详情页面：最近一次运行的指标与运行历史
+        """
+        history = list(reversed(self.get_data("run_metrics") or []))
+        if not history:
+            return [
+                {
+                    "component": "div",
+                    "text": "暂无运行记录",
+                    "props": {"class": "text-center"},
+                }
+            ]
+
+        latest = history[0]
+        latency = latest.get("latency") or {}
+        phases = latest.get("phases") or {}
+        cards = [
+            ("总耗时", f'{latest.get("elapsed", 0)} 秒'),
+            ("目录抓取", f'{phases.get("list", 0)} 秒'),
+            ("写入strm", f'{phases.get("write", 0)} 秒'),
+            ("本地扫描", f'{phases.get("scan", 0)} 秒'),
+            ("请求", f'{latest.get("requests", 0)} 次'),
+            (
+                "失败 / 重试 / 对冲",
+                f'{latest.get("errors", 0)} / {latest.get("retries", 0)} / {latest.get("hedges", 0)}',
+            ),
+            ("流量", f'{latest.get("bytes", 0) / 1024:.0f} KB'),
+            ("新建 / 获取", f'{latest.get("created", 0)} / {latest.get("files", 0)}'),
+            (
+                "请求耗时 p50/p95/p99",
+                f'{latency.get("p50", 0)} / {latency.get("p95", 0)} / {latency.get("p99", 0)} ms',
+            ),
+        ]
+        seasons = sorted(
+            (latest.get("seasons") or {}).items(), key=lambda item: -item[1]
+        )[:10]
+
+        def card(title: str, value: str) -> dict:
+            return {
+                "component": "VCol",
+                "props": {"cols": 6, "md": 4, "lg": 3},
+                "content": [
+                    {
+                        "component": "VCard",
+                        "props": {"variant": "tonal"},
+                        "content": [
+                            {
+                                "component": "VCardText",
+                                "content": [
+                                    {
+                                        "component": "div",
+                                        "props": {"class": "text-caption"},
+                                        "text": title,
+                                    },
+                                    {
+                                        "component": "div",
+                                        "props": {"class": "text-h6"},
+                                        "text": value,
+                                    },
+                                ],
+                            }
+                        ],
+                    }
+                ],
+            }
+
+        def table(headers: List[str], rows: List[List[Any]]) -> dict:
+            return {
+                "component": "VTable",
+                "props": {"hover": True, "density": "compact"},
+                "content": [
+                    {
+                        "component": "thead",
+                        "content": [
+                            {
+                                "component": "tr",
+                                "content": [
+                                    {
+                                        "component": "th",
+                                        "props": {"class": "text-start ps-4"},
+                                        "text": header,
+                                    }
+                                    for header in headers
+                                ],
+                            }
+                        ],
+                    },
+                    {
+                        "component": "tbody",
+                        "content": [
+                            {
+                                "component": "tr",
+                                "content": [
+                                    {
+                                        "component": "td",
+                                        "props": {"class": "ps-4"},
+                                        "text": str(value),
+                                    }
+                                    for value in row
+                                ],
+                            }
+                            for row in rows
+                        ],
+                    },
+                ],
+            }
+
+        page = [
+            {
+                "component": "div",
+                "props": {"class": "text-subtitle-1 mb-2"},
+                "text": f'最近一次运行：{latest.get("started_at")}（{latest.get("status")}）',
+            },
+            {"component": "VRow", "content": [card(*item) for item in cards]},
+        ]
+        if seasons:
+            page.append(
+                {
+                    "component": "div",
+                    "props": {"class": "text-subtitle-1 mt-4 mb-2"},
+                    "text": "季度抓取耗时",
+                }
+            )
+            page.append(
+                table(["季度", "耗时（秒）"], [[season, seconds] for season, seconds in seasons])
+            )
+        endpoints = latest.get("endpoints") or []
+        if endpoints:
+            page.append(
+                {
+                    "component": "div",
+                    "props": {"class": "text-subtitle-1 mt-4 mb-2"},
+                    "text": "目录列表站点",
+                }
+            )
+            page.append(
+                table(
+                    ["站点", "状态", "请求", "失败", "失败率", "p50 (ms)", "p95 (ms)"],
+                    [
+                        [
+                            endpoint.get("url"),
+                            "正常" if endpoint.get("healthy") else "暂停",
+                            endpoint.get("requests"),
+                            endpoint.get("failures"),
+                            endpoint.get("error_rate"),
+                            (endpoint.get("latency") or {}).get("p50"),
+                            (endpoint.get("latency") or {}).get("p95"),
+                        ]
+                        for endpoint in endpoints
+                    ],
+                )
+            )
+        page.append(
+            {
+                "component": "div",
+                "props": {"class": "text-subtitle-1 mt-4 mb-2"},
+                "text": "运行历史",
+            }
+        )
+        page.append(
+            table(
+                ["开始时间", "模式", "状态", "耗时", "请求", "失败", "重试", "新建", "p95 (ms)"],
+                [
+                    [
+                        run.get("started_at"),
+                        RUN_MODES.get(run.get("mode"), run.get("mode")),
+                        run.get("status"),
+                        run.get("elapsed"),
+                        run.get("requests"),
+                        run.get("errors"),
+                        run.get("retries"),
+                        run.get("created"),
+                        (run.get("latency") or {}).get("p95"),
+                    ]
+                    for run in history
+                ],
+            )
+        )
+        return page
 
     def stop_service(self):
         """
@@ -909,11 +2690,21 @@ class ANiStrmNew(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            if self._client:
+                self._client.close()
+                self._client = None
+            if self._store:
+                self._store.close()
+                self._store = None
+            if self._journal:
+                self._journal.close()
+                self._journal = None
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
 
 
 if __name__ == "__main__":
     anistrm = ANiStrmNew()
+    anistrm._client = OpenAniClient()
     name_list = anistrm.get_current_season_list()
     print(name_list)
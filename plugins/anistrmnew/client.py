@@ -0,0 +1,375 @@
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.config import settings
+from app.log import logger
+from app.utils.http import RequestUtils
+
+from .endpoints import Endpoint, EndpointPool
+from .metrics import RunMetrics
+from .ratelimit import (
+    MAX_RETRY_AFTER,
+    AdaptiveRateLimiter,
+    backoff_delay,
+    parse_retry_after,
+)
+
+# openani 站点地址
+OPENANI_BASE = "https://openani.an-i.workers.dev"
+
+# 浏览器请求头，与站点前端保持一致
+DEFAULT_HEADERS = {
+    "accept": "*/*",
+    "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+    "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
+    "origin": OPENANI_BASE,
+    "priority": "u=1, i",
+    "referer": f"{OPENANI_BASE}/",
+    "sec-ch-ua": '"Chromium";v="142", "Microsoft Edge";v="142", "Not_A Brand";v="99"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"macOS"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0",
+    "x-requested-with": "XMLHttpRequest",
+}
+
+# 目录列表请求体
+LIST_PAYLOAD = '{"password":"null"}'
+
+
+def list_payload(page_token: str = None, page_index: int = 0) -> str:
+    """
+    目录列表请求体，第一页之后带上分页令牌
+    """
+    if not page_token:
+        return LIST_PAYLOAD
+    return json.dumps(
+        {"password": "null", "page_token": page_token, "page_index": page_index}
+    )
+
+# 限流响应
+THROTTLE_STATUS = {429, 503}
+
+
+class OpenAniClient:
+    """
+    openani 请求客户端
+    插件内所有请求共用一个带连接池的会话，复用keep-alive连接，避免每次请求都重新握手
+    所有请求经过同一个自适应限速器，失败时按单个请求指数退避重试
+    目录列表请求发往站点池中延迟最低的健康站点，重试时重新选择；
+    开启对冲后，请求超过站点p95延迟仍未返回时向另一站点再发一次，取先返回的结果
+    """
+
+    def __init__(
+        self,
+        endpoints: Optional[Iterable[str]] = None,
+        pool_size: int = 8,
+        timeout: int = 20,
+        rate_limit: float = 10,
+        max_retries: int = 3,
+        max_pages: int = 0,
+        hedge: bool = False,
+    ):
+        """
+        :param endpoints: 目录列表使用的站点地址，默认为 openani 官方站点
+        :param pool_size: 连接池大小，应不小于抓取并发数
+        :param timeout: 请求超时时间（秒）
+        :param rate_limit: 最大请求速率（次/秒），0为不限速
+        :param max_retries: 单个请求最大重试次数
+        :param max_pages: 单个目录最多翻页数，0为不限制
+        :param hedge: 是否发送对冲请求
+        """
+        endpoints = [url for url in endpoints or [] if url and url.strip()]
+        self.pool = EndpointPool(endpoints or [OPENANI_BASE])
+        self._timeout = timeout
+        self._max_retries = max(0, int(max_retries or 0))
+        self._max_pages = max(0, int(max_pages or 0))
+        self._hedge = hedge
+        self._pool_size = max(1, int(pool_size or 1))
+        self.limiter = AdaptiveRateLimiter(rate=rate_limit)
+        # 累计请求次数（含重试与对冲）
+        self.requests = 0
+        # 累计重试次数
+        self.retries = 0
+        # 累计对冲请求次数
+        self.hedges = 0
+        # 当前运行的指标，由插件任务在运行期间设置
+        self.metrics: Optional[RunMetrics] = None
+        self._lock = threading.Lock()
+        self._session = self.__new_session(self._pool_size)
+        # 对冲请求线程池，首次对冲时创建
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def __new_session(pool_size: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @staticmethod
+    def url(path: str, base_url: str) -> str:
+        """相对路径转换为指定站点的完整目录地址"""
+        return f"{base_url}/{quote(path.strip('/'))}/"
+
+    def __request_utils(self) -> RequestUtils:
+        return RequestUtils(
+            ua=settings.USER_AGENT if settings.USER_AGENT else None,
+            proxies=settings.PROXY if settings.PROXY else None,
+            session=self._session,
+            timeout=self._timeout,
+        )
+
+    def __request(
+        self, method: str, url: str, endpoint: Optional[Endpoint] = None, **kwargs
+    ) -> Optional[requests.Response]:
+        """
+        发送单次请求，记录请求数、运行指标与站点延迟
+        """
+        with self._lock:
+            self.requests += 1
+        started = time.monotonic()
+        if method == "post":
+            rep = self.__request_utils().post(url=url, **kwargs)
+        else:
+            rep = self.__request_utils().get_res(url, **kwargs)
+        elapsed = time.monotonic() - started
+        status = rep.status_code if rep is not None else None
+        metrics = self.metrics
+        if metrics:
+            # 流式响应不读取内容，不计入流量
+            size = len(rep.content) if rep is not None and not kwargs.get("stream") else 0
+            metrics.record_request(elapsed, status, size)
+        if endpoint:
+            self.pool.record(endpoint, elapsed, ok=not self.__retryable(status))
+        return rep
+
+    @staticmethod
+    def __retryable(status: Optional[int]) -> bool:
+        return status is None or status in THROTTLE_STATUS or status >= 500
+
+    def __send(
+        self,
+        attempt: Callable[[], Optional[requests.Response]],
+        target: str,
+        limiter: Optional[AdaptiveRateLimiter] = None,
+    ) -> Optional[requests.Response]:
+        """
+        限速发送请求，网络异常、5xx及限流响应按指数退避重试，
+        限流响应优先遵循Retry-After，要求等待超过 MAX_RETRY_AFTER 秒时不再重试
+        :param attempt: 发送一次请求
+        :param target: 请求地址或路径，用于日志
+        :param limiter: 指定限速器，默认使用客户端共用的限速器
+        """
+        limiter = limiter or self.limiter
+        rep = None
+        for attempt_no in range(self._max_retries + 1):
+            limiter.acquire()
+            rep = attempt()
+            status = rep.status_code if rep is not None else None
+            throttled = status in THROTTLE_STATUS
+            retryable = self.__retryable(status)
+            retry_after = (
+                parse_retry_after(rep.headers.get("Retry-After")) if throttled else None
+            )
+            limiter.feedback(
+                success=not retryable, throttled=throttled, retry_after=retry_after
+            )
+            if not retryable or attempt_no >= self._max_retries:
+                return rep
+            if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                logger.warning(
+                    f"上游要求 {retry_after:.0f} 秒后重试，超过 {MAX_RETRY_AFTER:.0f} 秒，放弃请求：{target[:100]}"
+                )
+                return rep
+            if rep is not None:
+                # 释放连接，流式响应未读取时不会自动归还连接池
+                rep.close()
+            delay = retry_after if retry_after is not None else backoff_delay(attempt_no)
+            logger.debug(
+                f'请求失败（{status or "无响应"}），{delay:.1f}秒后重试：{target[:100]}'
+            )
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+        return rep
+
+    def __post_listing(
+        self, endpoint: Endpoint, path: str, data: str
+    ) -> Optional[requests.Response]:
+        url = self.url(path, endpoint.url)
+        headers = DEFAULT_HEADERS.copy()
+        headers["origin"] = endpoint.url
+        headers["referer"] = url
+        return self.__request("post", url, endpoint=endpoint, headers=headers, data=data)
+
+    def __hedge_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if not self._hedge_executor:
+                # 首个请求与对冲请求都在线程池中执行
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self._pool_size * 2, thread_name_prefix="anistrm-hedge"
+                )
+            return self._hedge_executor
+
+    def __list_attempt(self, path: str, data: str) -> Optional[requests.Response]:
+        """
+        向最快的健康站点发送一次目录列表请求，
+        超过该站点p95延迟未返回时向另一站点发送对冲请求，取先返回的可用结果
+        """
+        endpoint = self.pool.select()
+        delay = self.pool.hedge_delay(endpoint) if self._hedge else None
+        if delay is None:
+            return self.__post_listing(endpoint, path, data)
+        executor = self.__hedge_pool()
+        primary = executor.submit(self.__post_listing, endpoint, path, data)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        backup = self.pool.select(exclude=endpoint)
+        self.limiter.acquire()
+        with self._lock:
+            self.hedges += 1
+        logger.debug(
+            f"{endpoint.url} 超过 {delay * 1000:.0f}ms 未响应，向 {backup.url} 发送对冲请求：{path}"
+        )
+        pending = {primary, executor.submit(self.__post_listing, backup, path, data)}
+        rep = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rep = future.result()
+                if rep is not None and not self.__retryable(rep.status_code):
+                    # 较慢的请求在后台完成，只记录站点延迟
+                    return rep
+        return rep
+
+    def get(
+        self, url: str, limiter: Optional[AdaptiveRateLimiter] = None, **kwargs
+    ) -> Optional[requests.Response]:
+        """发送GET请求，如校验strm地址"""
+        return self.__send(
+            lambda: self.__request("get", url, **kwargs), url, limiter=limiter
+        )
+
+    def list_request(
+        self, path: str, data: str = LIST_PAYLOAD
+    ) -> Optional[requests.Response]:
+        """
+        发送目录列表请求，每次尝试重新选择站点
+        :param path: 相对路径，如 2024-1 或 2024-1/番剧名
+        """
+        return self.__send(lambda: self.__list_attempt(path, data), path)
+
+    def list_page(
+        self, path: str, page_token: str = None, page_index: int = 0
+    ) -> Optional[Tuple[List[dict], Optional[str]]]:
+        """
+        列出目录的一页
+        :return: (文件列表, 下一页令牌)，失败返回None
+        """
+        rep = self.list_request(path, data=list_payload(page_token, page_index))
+        if not (rep and rep.status_code == 200):
+            logger.warning(
+                f'获取 {path} 失败: HTTP {rep.status_code if rep else "无响应"}'
+            )
+            return None
+        data = rep.json()
+        # 兼容 {"files": [...]} 与 {"data": {"files": [...]}} 两种格式
+        files = data.get("files")
+        if files is None:
+            files = (data.get("data") or {}).get("files") or []
+        return files, data.get("nextPageToken") or None
+
+    def iter_folder(self, path: str) -> "FolderPages":
+        """
+        分页列出目录，逐页产出
+        :param path: 相对路径，如 2024-1 或 2024-1/番剧名
+        """
+        return FolderPages(self, path, self._max_pages)
+
+    def list_folder(self, path: str) -> Optional[List[dict]]:
+        """
+        列出目录，自动翻页
+        :param path: 相对路径，如 2024-1 或 2024-1/番剧名
+        :return: 文件列表，失败返回None；超过翻页上限时返回已获取的部分
+        """
+        pages = self.iter_folder(path)
+        files = [file for page in pages for file in page]
+        return None if pages.failed else files
+
+    def close(self):
+        """关闭连接池"""
+        with self._lock:
+            if self._hedge_executor:
+                self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+                self._hedge_executor = None
+            if self._session:
+                self._session.close()
+                self._session = None
+
+
+class FolderPages:
+    """
+    目录分页迭代器
+    逐页产出文件列表，产出当前页时在后台预取下一页，翻页与调用方处理重叠；
+    同一时间最多缓存两页，超过翻页上限时停止并标记为不完整
+    """
+
+    def __init__(self, client: OpenAniClient, path: str, max_pages: int = 0):
+        self._client = client
+        self._path = path
+        self._max_pages = max_pages
+        # 已获取的页数
+        self.pages = 0
+        # 列出失败（已产出的页仍然有效）
+        self.failed = False
+        # 达到翻页上限，未列出全部文件
+        self.truncated = False
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed and not self.truncated
+
+    def __iter__(self) -> Iterator[List[dict]]:
+        prefetch: Optional[ThreadPoolExecutor] = None
+        try:
+            result = self._client.list_page(self._path)
+            while True:
+                if result is None:
+                    self.failed = True
+                    return
+                self.pages += 1
+                files, token = result
+                future = None
+                if token:
+                    if self._max_pages and self.pages >= self._max_pages:
+                        logger.warning(
+                            f"{self._path} 超过 {self._max_pages} 页，本次只获取前 {self.pages} 页"
+                        )
+                        self.truncated = True
+                        token = None
+                    else:
+                        prefetch = prefetch or ThreadPoolExecutor(
+                            max_workers=1, thread_name_prefix="anistrm-run-page"
+                        )
+                        future = prefetch.submit(
+                            self._client.list_page, self._path, token, self.pages
+                        )
+                yield files
+                if future is None:
+                    return
+                result = future.result()
+        finally:
+            if prefetch:
+                prefetch.shutdown(wait=False, cancel_futures=True)
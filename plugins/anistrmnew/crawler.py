@@ -0,0 +1,517 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from queue import Full, Queue
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.log import logger
+
+# Google Drive 目录类型
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+# 抓取结束标记
+_DONE = object()
+
+
+class _SeasonDone:
+    """
+    季度完成标记，在该季度的全部批次之后放入产出队列
+    """
+
+    __slots__ = ("season",)
+
+    def __init__(self, season: str):
+        self.season = season
+
+
+def _etag_line(file: dict) -> str:
+    return f'{file.get("name")}|{file.get("modifiedTime")}|{file.get("size")}\n'
+
+
+def _etag(entries: List[Tuple[str, str]]) -> str:
+    """
+    按文件名排序后计算摘要
+    :param entries: [(文件名, 摘要行)]
+    """
+    digest = hashlib.sha1()
+    for _, line in sorted(entries, key=lambda entry: entry[0]):
+        digest.update(line.encode())
+    return digest.hexdigest()
+
+
+class _SinglePage:
+    """
+    将不分页的列目录方法适配为分页迭代
+    """
+
+    def __init__(self, list_folder: Callable[[str], Optional[List[dict]]], path: str):
+        self._list_folder = list_folder
+        self._path = path
+        self.pages = 0
+        self.failed = False
+        self.truncated = False
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed and not self.truncated
+
+    def __iter__(self) -> Iterator[List[dict]]:
+        files = self._list_folder(self._path)
+        if files is None:
+            self.failed = True
+            return
+        self.pages = 1
+        yield files
+
+
+class CrawlStats:
+    """
+    单次抓取的统计信息
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.folders = 0
+        self.files = 0
+        self.skipped = 0
+        self.sealed = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        # 各顶层目录的抓取耗时（秒），从列出根目录到最后一个番剧文件夹完成
+        self.seasons: Dict[str, float] = {}
+
+    def incr(self, **kwargs):
+        with self._lock:
+            for key, value in kwargs.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+
+    def __str__(self):
+        return (
+            f"耗时 {self.elapsed:.1f} 秒，请求 {self.requests} 次，"
+            f"番剧文件夹 {self.folders} 个，未变化跳过 {self.skipped} 个，封存季度 {self.sealed} 个，"
+            f"剧集文件 {self.files} 个，失败 {self.errors} 次"
+        )
+
+
+class AniCrawler:
+    """
+    openani 目录并发抓取器
+    季度根目录与番剧文件夹均通过有界线程池并发列出，
+    同时限制单个季度的并发数，避免集中请求同一目录
+    传入目录快照时启用增量抓取：上级目录中修改时间未变的番剧文件夹直接跳过，
+    列出后内容摘要未变的番剧文件夹不再返回剧集；
+    新增剧集不一定更新上级目录中的修改时间，快照超过最长有效时间后强制重新列出
+    传入季度索引时，已封存的季度只校验一次根目录摘要，未变化则整季跳过
+    """
+
+    def __init__(
+        self,
+        list_folder: Callable[[str], Optional[List[dict]]],
+        max_workers: int = 8,
+        season_workers: int = 4,
+        snapshots: Optional[Dict[str, dict]] = None,
+        season_index: Optional[Dict[str, dict]] = None,
+        queue_size: int = 0,
+        skip: Optional[Set[str]] = None,
+        on_complete: Optional[Callable[[str], None]] = None,
+        skip_folder: Optional[Callable[[str, str], bool]] = None,
+        iter_folder: Optional[Callable[[str], Iterable[List[dict]]]] = None,
+        write_failed: Optional[Callable[[str], bool]] = None,
+        on_season_complete: Optional[Callable[[str], None]] = None,
+        snapshot_max_age: float = 0,
+    ):
+        """
+        :param list_folder: 列出目录的方法，传入相对路径（如 2024-1/xxx），返回文件列表，失败返回None
+        :param max_workers: 全局最大并发数
+        :param season_workers: 单个季度最大并发数
+        :param snapshots: 上次抓取的目录快照，{季度/番剧文件夹: {"modified", "count", "etag", "at"}}，None则全量抓取
+        :param season_index: 季度索引，{季度: {"etag", "stable_runs", "sealed"}}，None则不校验封存
+        :param queue_size: 流式产出队列长度（批），默认为全局并发数的2倍
+        :param skip: 直接跳过的番剧文件夹（季度/番剧文件夹），如断点续传时已完成的部分
+        :param on_complete: 番剧文件夹的剧集被调用方处理完成后的回调，参数为 季度/番剧文件夹
+        :param skip_folder: 判断番剧文件夹是否无需列出，参数为（季度, 番剧文件夹），如已被其它来源覆盖
+        :param iter_folder: 分页列出目录的方法，返回逐页产出的可迭代对象（带 pages/failed/truncated/complete 属性）；
+                            提供时大目录逐页产出剧集，不提供则使用 list_folder 一次列出
+        :param write_failed: 调用方处理批次后判断是否有剧集写入失败，参数为 季度/番剧文件夹 或 季度；
+                             为真时该番剧文件夹不记入快照也不回调完成，季度记为不完整，下次运行重新处理
+        :param on_season_complete: 季度的全部番剧文件夹都已列出且调用方处理完成时的回调，参数为季度，用于断点
+        :param snapshot_max_age: 快照最长有效时间（秒），超过后即使修改时间未变也重新列出，0为不限制
+        """
+        self._list_folder = list_folder
+        self._max_workers = max(1, int(max_workers or 1))
+        self._season_workers = max(1, int(season_workers or 1))
+        self._snapshots = snapshots
+        self._season_index = season_index
+        self._failed_seasons = set()
+        self._queue_size = max(1, int(queue_size or self._max_workers * 2))
+        self._stop = threading.Event()
+        self._skip = skip or set()
+        self._on_complete = on_complete
+        self._skip_folder = skip_folder
+        self._iter_folder = iter_folder
+        self._write_failed = write_failed
+        self._on_season_complete = on_season_complete
+        self._snapshot_max_age = max(0.0, float(snapshot_max_age or 0))
+        self.stats = CrawlStats()
+        # 本次抓取产生的新快照，调用方处理完对应批次后才记入，由调用方保存
+        self.updated_snapshots: Dict[str, dict] = {}
+        # 本次抓取的季度结果：{季度: {"etag", "complete", "verified"}}
+        self.updated_seasons: Dict[str, dict] = {}
+
+    @staticmethod
+    def listing_etag(files: List[dict]) -> str:
+        """
+        计算目录列表摘要
+        """
+        return _etag([(file.get("name") or "", _etag_line(file)) for file in files])
+
+    def __unchanged(self, key: str, modified: Optional[str]) -> bool:
+        """
+        番剧文件夹修改时间与快照一致且快照未过期时视为未变化
+        """
+        if self._snapshots is None or not modified:
+            return False
+        snapshot = self._snapshots.get(key)
+        if not snapshot or snapshot.get("modified") != modified:
+            return False
+        return (
+            not self._snapshot_max_age
+            or time.time() - (snapshot.get("at") or 0) < self._snapshot_max_age
+        )
+
+    def __sealed(self, season: str, etag: str) -> bool:
+        """
+        季度已封存且根目录摘要一致
+        """
+        if self._season_index is None:
+            return False
+        entry = self._season_index.get(season)
+        return bool(entry and entry.get("sealed") and entry.get("etag") == etag)
+
+    def crawl(self, seasons: List[str]) -> List[Dict]:
+        """
+        抓取多个顶层目录（季度或ANi目录）下的所有剧集文件
+        :return: [{"name": 文件名, "season": 季度, "folder": 番剧文件夹}]，根目录文件无folder
+        """
+        return [file for batch in self.iter_crawl(seasons) for file in batch]
+
+    def iter_crawl(self, seasons: List[str]) -> Iterator[List[Dict]]:
+        """
+        流式抓取，每个番剧文件夹列出后立即产出一批剧集文件
+        抓取在后台线程进行，与调用方的处理重叠；产出队列有界，
+        调用方处理不及时会反压抓取，内存占用与季度数量无关
+        """
+        self.stats = CrawlStats()
+        self._failed_seasons = set()
+        self._stop.clear()
+        output: Queue = Queue(maxsize=self._queue_size)
+        producer = threading.Thread(
+            target=self.__produce,
+            args=(list(seasons), output),
+            name="anistrm-run-producer",
+            daemon=True,
+        )
+        producer.start()
+        finished = False
+        try:
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    finished = True
+                    break
+                if isinstance(item, _SeasonDone):
+                    if (
+                        self._on_season_complete
+                        and item.season not in self._failed_seasons
+                        and not (self._write_failed and self._write_failed(item.season))
+                    ):
+                        self._on_season_complete(item.season)
+                    continue
+                key, snapshot, batch = item
+                if not batch:
+                    self.__folder_done(key, snapshot)
+                    continue
+                self.stats.incr(files=len(batch))
+                try:
+                    yield batch
+                except GeneratorExit:
+                    # 调用方处理完该批次后因预算用完等原因提前结束，该番剧文件夹同样记为完成
+                    self.__folder_done(key, snapshot)
+                    raise
+                self.__folder_done(key, snapshot)
+        finally:
+            # 调用方提前结束时通知抓取线程退出
+            self._stop.set()
+            producer.join()
+            # 调用方处理完全部批次后才能确定季度是否完整
+            for season, result in self.updated_seasons.items():
+                if not result["verified"]:
+                    result["complete"] = (
+                        finished
+                        and season not in self._failed_seasons
+                        and not (self._write_failed and self._write_failed(season))
+                    )
+            self.stats.finish()
+            logger.info(f"目录抓取完成，{self.stats}")
+
+    def __folder_done(self, key: Optional[str], snapshot: Optional[dict]):
+        """
+        调用方处理完番剧文件夹的最后一批剧集且全部写入后再记入快照并回调完成
+        """
+        if not key:
+            return
+        if self._write_failed and self._write_failed(key):
+            self._failed_seasons.add(key.split("/", 1)[0])
+            return
+        if snapshot:
+            self.updated_snapshots[key] = snapshot
+        if self._on_complete:
+            self._on_complete(key)
+
+    def __put(self, output: Queue, item: Any) -> bool:
+        """
+        放入产出队列，队列满时等待，调用方结束后放弃
+        """
+        while not self._stop.is_set():
+            try:
+                output.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+
+    def __open_season(
+        self, season: str, items: List[dict], output: Queue
+    ) -> Deque[Tuple[str, Optional[str]]]:
+        """
+        处理季度根目录列表：校验封存、过滤未变化的番剧文件夹、产出根目录文件
+        :return: 待抓取的番剧文件夹队列
+        """
+        queue: Deque[Tuple[str, Optional[str]]] = deque()
+        logger.info(f"获取 {season} 目录: {len(items)} 个条目")
+        etag = self.listing_etag(items)
+        if self.__sealed(season, etag):
+            logger.info(f"{season} 已封存且未变化，跳过")
+            self.stats.incr(sealed=1)
+            self.updated_seasons[season] = {
+                "etag": etag,
+                "complete": True,
+                "verified": True,
+            }
+            return queue
+        self.updated_seasons[season] = {"etag": etag, "verified": False}
+        root_files = []
+        for item in items:
+            if item.get("mimeType") == FOLDER_MIME_TYPE:
+                folder_name = item.get("name")
+                modified = item.get("modifiedTime")
+                key = f"{season}/{folder_name}"
+                if (
+                    key in self._skip
+                    or self.__unchanged(key, modified)
+                    or (self._skip_folder and self._skip_folder(season, folder_name))
+                ):
+                    self.stats.incr(skipped=1)
+                    continue
+                queue.append((folder_name, modified))
+            elif "video" in item.get("mimeType", ""):
+                file_name = item.get("name")
+                logger.info(f"  发现根目录文件: {file_name}")
+                root_files.append({"name": file_name, "season": season})
+        if root_files:
+            self.__put(output, (None, None, root_files))
+        return queue
+
+    def __produce(self, seasons: List[str], output: Queue):
+        """
+        抓取线程：季度根目录与番剧文件夹共用线程池，
+        待抓取的番剧文件夹积压较少时才展开下一个季度，
+        轮询各季度队列提交任务，同时满足全局与单季度并发上限
+        """
+        pending_seasons: Deque[str] = deque(seasons)
+        jobs: Dict[str, Deque[Tuple[str, Optional[str]]]] = {}
+        inflight: Dict[str, int] = defaultdict(int)
+        futures = {}
+        # 各季度开始抓取的时间
+        started: Dict[str, float] = {}
+        # 正在列出根目录的季度数
+        opening = 0
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="anistrm-run-crawl"
+            ) as pool:
+                while not self._stop.is_set():
+                    # 展开新季度，未返回的根目录按单季度并发数估算积压
+                    backlog = sum(len(queue) for queue in jobs.values())
+                    while (
+                        pending_seasons
+                        and len(futures) < self._max_workers
+                        and backlog + opening * self._season_workers
+                        < self._max_workers * 2
+                    ):
+                        season = pending_seasons.popleft()
+                        started[season] = time.monotonic()
+                        futures[pool.submit(self.__list_root, season)] = (season, None)
+                        inflight[season] += 1
+                        opening += 1
+                    # 提交番剧文件夹
+                    progressed = True
+                    while progressed and len(futures) < self._max_workers:
+                        progressed = False
+                        for season, queue in jobs.items():
+                            if len(futures) >= self._max_workers:
+                                break
+                            if not queue or inflight[season] >= self._season_workers:
+                                continue
+                            folder_name, modified = queue.popleft()
+                            future = pool.submit(
+                                self.__crawl_folder, season, folder_name, modified, output
+                            )
+                            futures[future] = (season, folder_name)
+                            inflight[season] += 1
+                            progressed = True
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        season, folder_name = futures.pop(future)
+                        inflight[season] -= 1
+                        if folder_name is not None:
+                            key, snapshot, batch = future.result()
+                            if key or batch:
+                                self.__put(output, (key, snapshot, batch))
+                        else:
+                            opening -= 1
+                            try:
+                                items = future.result()
+                            except Exception as e:
+                                logger.warning(f"获取 {season} 目录失败: {str(e)}")
+                                self.stats.incr(errors=1)
+                                self._failed_seasons.add(season)
+                                items = None
+                            if items is not None:
+                                jobs[season] = self.__open_season(season, items, output)
+                        # 季度的番剧文件夹全部完成
+                        if not inflight[season] and not jobs.get(season):
+                            self.stats.seasons[season] = time.monotonic() - started[season]
+                            self.__put(output, _SeasonDone(season))
+                if self._stop.is_set():
+                    for future in futures:
+                        future.cancel()
+        except Exception as e:
+            logger.error(f"目录抓取异常: {str(e)}")
+            self._failed_seasons.update(seasons)
+        finally:
+            self.__put(output, _DONE)
+
+    def __pages(self, path: str):
+        if self._iter_folder:
+            return self._iter_folder(path)
+        return _SinglePage(self._list_folder, path)
+
+    def __crawl_folder(
+        self,
+        season: str,
+        folder_name: str,
+        modified: Optional[str] = None,
+        output: Optional[Queue] = None,
+    ) -> Tuple[Optional[str], Optional[dict], List[Dict]]:
+        """
+        列出单个番剧文件夹，异常只影响当前文件夹
+        只有一页时整页返回，内容未变化时不返回剧集；
+        多页时从第二页起逐页放入产出队列，与翻页、调用方处理重叠，内存占用与目录大小无关
+        列出失败、中途停止或超过翻页上限时不产生快照，季度记为不完整
+        :return: (季度/番剧文件夹, 新快照, 剧集文件)，列出失败时为 (None, None, 已获取的剧集)，未启用快照时新快照为None
+        """
+        held: List[Dict] = []
+        try:
+            key = f"{season}/{folder_name}"
+            pages = self.__pages(key)
+            iterator = iter(pages)
+            entries: List[Tuple[str, str]] = []
+            streaming = False
+            stopped = False
+            count = 0
+            try:
+                for index, page in enumerate(iterator):
+                    count += len(page)
+                    if self._snapshots is not None:
+                        entries.extend(
+                            (file.get("name") or "", _etag_line(file)) for file in page
+                        )
+                    # 只关心视频文件，忽略子目录及其它类型
+                    files = [
+                        {
+                            "name": file["name"],
+                            "season": season,
+                            "folder": folder_name,
+                            "modified": file.get("modifiedTime"),
+                        }
+                        for file in page
+                        if "video" in file.get("mimeType", "")
+                    ]
+                    if index == 0:
+                        held = files
+                    else:
+                        if not streaming:
+                            streaming = True
+                            if held and output is not None:
+                                self.__put(output, (None, None, held))
+                            held = []
+                        if files and output is not None:
+                            self.__put(output, (None, None, files))
+                    if self._stop.is_set():
+                        stopped = True
+                        break
+            finally:
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+            self.stats.incr(requests=max(1, pages.pages))
+            if pages.failed or stopped or pages.truncated:
+                if pages.failed:
+                    self.stats.incr(errors=1)
+                self._failed_seasons.add(season)
+                return None, None, held
+            self.stats.incr(folders=1)
+            logger.info(
+                f"  获取 {folder_name}: {count} 个剧集文件"
+                + (f"（{pages.pages} 页）" if pages.pages > 1 else "")
+            )
+            if self._snapshots is None:
+                return key, None, held
+            snapshot = {
+                "modified": modified,
+                "count": count,
+                "etag": _etag(entries),
+                "at": int(time.time()),
+            }
+            if not streaming and (self._snapshots.get(key) or {}).get("etag") == snapshot["etag"]:
+                logger.debug(f"  {folder_name} 内容未变化，跳过")
+                return key, snapshot, []
+            return key, snapshot, held
+        except Exception as e:
+            logger.warning(f"处理番剧文件夹 {folder_name} 时出错: {str(e)}")
+            self._failed_seasons.add(season)
+            self.stats.incr(errors=1)
+            return None, None, held
+
+    def __list_root(self, season: str) -> Optional[List[dict]]:
+        """
+        列出顶层目录的全部页，未完整列出时季度记为不完整
+        """
+        pages = self.__pages(season)
+        items = [file for page in pages for file in page]
+        self.stats.incr(requests=max(1, pages.pages))
+        if pages.failed:
+            self.stats.incr(errors=1)
+        if not pages.complete:
+            self._failed_seasons.add(season)
+        return items if pages.pages else None
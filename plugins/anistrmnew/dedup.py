@@ -0,0 +1,75 @@
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .parser import episode_key, normalize_title
+
+
+class EpisodeIndex:
+    """
+    跨来源剧集去重索引
+    同一集可能同时出现在季度目录与ANi目录中，文件名不一定相同；
+    以（归一化标题, 集数, 版本）为键，季度目录的剧集只登记不丢弃，
+    写入前丢弃ANi目录中与季度目录重复的剧集，
+    并记录已覆盖的番剧名称，用于跳过ANi目录中对应的整个番剧文件夹
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._episodes: Dict[Tuple[str, str, str], str] = {}
+        # 已覆盖的番剧：归一化的番剧文件夹名称与标题
+        self._titles: Set[str] = set()
+        # 丢弃的重复剧集数
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self._episodes)
+
+    def add_folder(self, folder: str):
+        """
+        记录已知的番剧文件夹
+        """
+        if folder:
+            with self._lock:
+                self._titles.add(normalize_title(folder))
+
+    def covers(self, folder: str) -> bool:
+        """
+        番剧文件夹是否已被其它来源覆盖
+        """
+        return normalize_title(folder) in self._titles
+
+    def seed(self, files: Iterable[Tuple[str, str]]):
+        """
+        从已处理记录导入，不计入重复数
+        :param files: [(文件名, 番剧文件夹)]
+        """
+        for file_name, folder in files:
+            key = episode_key(file_name)
+            with self._lock:
+                self._episodes.setdefault(key, file_name)
+                self._titles.add(key[0])
+                if folder:
+                    self._titles.add(normalize_title(folder))
+
+    def filter(self, batch: List[Dict]) -> List[Dict]:
+        """
+        过滤一批剧集文件：季度目录的剧集全部保留并登记，
+        ANi目录的剧集已在季度目录中出现时丢弃，同名文件不视为重复
+        """
+        result = []
+        with self._lock:
+            for file_info in batch:
+                file_name = file_info["name"]
+                key = episode_key(file_name)
+                if file_info.get("season") == "ANi":
+                    known = self._episodes.get(key)
+                    if known is not None and known != file_name:
+                        self.duplicates += 1
+                        continue
+                else:
+                    self._episodes.setdefault(key, file_name)
+                    self._titles.add(key[0])
+                    if file_info.get("folder"):
+                        self._titles.add(normalize_title(file_info["folder"]))
+                result.append(file_info)
+        return result
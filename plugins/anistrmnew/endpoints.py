@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .metrics import LatencyHistogram
+
+
+class Endpoint:
+    """
+    单个站点的延迟与健康状态
+    """
+
+    # 滑动平均的权重
+    _alpha = 0.3
+    # 连续失败后的熔断时间（秒），按连续失败次数翻倍
+    _cooldown = 5
+    _max_cooldown = 300
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = LatencyHistogram()
+        # 延迟滑动平均（毫秒），未请求过为None
+        self.ewma: Optional[float] = None
+        # 失败率滑动平均
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        # 熔断截止时间（monotonic）
+        self.down_until = 0.0
+        self.last_used = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return self.down_until <= now
+
+    def score(self) -> float:
+        """
+        越小越优先，未请求过的站点优先尝试一次
+        """
+        if self.ewma is None:
+            return 0.0
+        return self.ewma * (1 + 4 * self.error_rate)
+
+    def record(self, millis: float, ok: bool, now: float):
+        self.requests += 1
+        self.latency.add(millis)
+        self.ewma = (
+            millis if self.ewma is None else self._alpha * millis + (1 - self._alpha) * self.ewma
+        )
+        self.error_rate = (1 - self._alpha) * self.error_rate + (0 if ok else self._alpha)
+        if ok:
+            self.consecutive_failures = 0
+            self.down_until = 0.0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= 2:
+            cooldown = self._cooldown * 2 ** (self.consecutive_failures - 2)
+            self.down_until = now + min(cooldown, self._max_cooldown)
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy(now),
+            "requests": self.requests,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 3),
+            "ewma": round(self.ewma, 1) if self.ewma is not None else None,
+            "latency": self.latency.summary(),
+        }
+
+
+class EndpointPool:
+    """
+    openani 站点池（镜像或自建反代）
+    持续记录每个站点的延迟与失败情况，请求发往得分最好的健康站点；
+    连续失败的站点短暂熔断，定期探索最久未使用的站点，使恢复的站点有机会重新被选中
+    """
+
+    # 每隔多少次选择探索一次最久未使用的站点
+    _explore_every = 20
+    # 计算对冲延迟所需的最少样本数
+    _hedge_min_samples = 20
+
+    def __init__(self, urls: Iterable[str]):
+        self._lock = threading.Lock()
+        self._selections = 0
+        # 去重并保持配置顺序
+        self.endpoints: List[Endpoint] = [
+            Endpoint(url)
+            for url in dict.fromkeys(
+                url.strip().rstrip("/") for url in urls if url and url.strip()
+            )
+        ]
+        if not self.endpoints:
+            raise ValueError("未配置openani站点")
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def select(self, exclude: Optional[Endpoint] = None) -> Endpoint:
+        """
+        选择站点
+        :param exclude: 排除的站点，如对冲请求排除首个请求所用站点；只有一个站点时忽略
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e is not exclude] or self.endpoints
+            healthy = [e for e in candidates if e.healthy(now)]
+            if not healthy:
+                # 全部熔断时选择最早恢复的站点
+                chosen = min(candidates, key=lambda e: e.down_until)
+            else:
+                self._selections += 1
+                if len(healthy) > 1 and self._selections % self._explore_every == 0:
+                    chosen = min(healthy, key=lambda e: e.last_used)
+                else:
+                    chosen = min(healthy, key=Endpoint.score)
+            chosen.last_used = now
+            return chosen
+
+    def record(self, endpoint: Endpoint, seconds: float, ok: bool):
+        """
+        记录一次请求结果
+        :param ok: 是否成功，网络异常、5xx与限流视为失败
+        """
+        with self._lock:
+            endpoint.record(seconds * 1000, ok, time.monotonic())
+
+    def hedge_delay(self, endpoint: Endpoint) -> Optional[float]:
+        """
+        对冲请求的等待时间（秒）：站点的p95延迟，样本不足时不对冲
+        """
+        with self._lock:
+            if endpoint.latency.count < self._hedge_min_samples:
+                return None
+            return endpoint.latency.percentile(95) / 1000
+
+    def to_list(self) -> List[Dict]:
+        with self._lock:
+            now = time.monotonic()
+            return [endpoint.to_dict(now) for endpoint in self.endpoints]
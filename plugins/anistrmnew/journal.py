@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import IO, Iterable, List, Optional, Tuple
+
+from app.log import logger
+
+# 变更类型
+CREATE = "create"
+OVERWRITE = "overwrite"
+DELETE = "delete"
+
+
+class ChangeJournal:
+    """
+    strm文件变更日志
+    只追加的JSONL文件，每行一条变更，带单调递增的序号；
+    文件超过大小上限后轮转为新分段（文件名为分段的起始序号），只保留最近的若干分段；
+    下游按序号增量读取变更，不必扫描整个存储目录
+    """
+
+    _prefix = "changes-"
+    _suffix = ".jsonl"
+
+    def __init__(self, dir_path: Path, max_bytes: int = 4 * 1024 * 1024, keep: int = 8):
+        """
+        :param dir_path: 日志目录
+        :param max_bytes: 单个分段大小上限
+        :param keep: 保留的分段数
+        """
+        self._dir = Path(dir_path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._keep = max(1, keep)
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        self._size = 0
+        self.seq = self.__last_seq()
+
+    def __segments(self) -> List[Tuple[int, Path]]:
+        """所有分段，按起始序号排序"""
+        segments = []
+        for path in self._dir.glob(f"{self._prefix}*{self._suffix}"):
+            try:
+                segments.append((int(path.name[len(self._prefix) : -len(self._suffix)]), path))
+            except ValueError:
+                continue
+        return sorted(segments)
+
+    def __last_seq(self) -> int:
+        """从最后一个分段的末行恢复序号"""
+        segments = self.__segments()
+        if not segments:
+            return 0
+        first, path = segments[-1]
+        last = first - 1
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    last = json.loads(line)["seq"]
+                except (ValueError, KeyError):
+                    # 崩溃时写了一半的行
+                    continue
+        return last
+
+    def __open(self):
+        segments = self.__segments()
+        if segments and segments[-1][1].stat().st_size < self._max_bytes:
+            path = segments[-1][1]
+        else:
+            path = self._dir / f"{self._prefix}{self.seq + 1:012d}{self._suffix}"
+            for _, stale in segments[: max(0, len(segments) + 1 - self._keep)]:
+                try:
+                    stale.unlink()
+                except OSError as e:
+                    logger.warning(f"删除变更日志分段失败 {stale}: {str(e)}")
+        # 行缓冲，每条变更写入后即可被读取
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._size = path.stat().st_size
+
+    def append(self, op: str, path: str, **extra):
+        """
+        追加一条变更
+        :param op: create / overwrite / delete
+        :param path: strm文件路径
+        """
+        with self._lock:
+            if self._file is None or self._size >= self._max_bytes:
+                self.__close_file()
+                self.__open()
+            self.seq += 1
+            line = json.dumps(
+                {"seq": self.seq, "ts": int(time.time()), "op": op, "path": path, **extra},
+                ensure_ascii=False,
+            )
+            self._file.write(line + "\n")
+            self._size += len(line.encode("utf-8")) + 1
+
+    def extend(self, op: str, paths: Iterable[str], **extra):
+        for path in paths:
+            self.append(op, path, **extra)
+
+    def since(self, seq: int = 0, limit: int = 1000) -> dict:
+        """
+        读取序号大于seq的变更
+        :return: {"changes", "next": 下次读取使用的序号, "latest": 最新序号, "oldest": 最早可读的序号,
+                  "reset": 请求的序号超出保留范围，下游需要全量扫描一次}
+        """
+        limit = max(1, int(limit or 1000))
+        with self._lock:
+            segments = self.__segments()
+            latest = self.seq
+        oldest = segments[0][0] if segments else latest + 1
+        changes = []
+        # 跳过全部早于seq的分段
+        start = 0
+        for idx, (first, _) in enumerate(segments):
+            if first <= seq + 1:
+                start = idx
+        for _, path in segments[start:]:
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        try:
+                            change = json.loads(line)
+                        except ValueError:
+                            continue
+                        if change.get("seq", 0) <= seq:
+                            continue
+                        changes.append(change)
+                        if len(changes) >= limit:
+                            break
+            except FileNotFoundError:
+                # 读取期间被轮转删除
+                continue
+            if len(changes) >= limit:
+                break
+        return {
+            "changes": changes,
+            "next": changes[-1]["seq"] if changes else max(seq, 0),
+            "latest": latest,
+            "oldest": oldest,
+            "reset": seq + 1 < oldest or seq > latest,
+        }
+
+    def __close_file(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self.__close_file()
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Set, Tuple
+
+from app.log import logger
+
+from .writer import TMP_PREFIX, TMP_SUFFIX
+
+# 超过该时间未修改的临时文件视为崩溃残留（秒），较新的可能正在被其它线程写入
+STALE_TMP_SECONDS = 3600
+
+
+class LocalIndex:
+    """
+    本地strm文件索引
+    每次运行用os.scandir遍历一次存储目录，之后以集合判断文件是否存在，
+    避免网络挂载目录下逐个stat；写入新文件后同步更新索引；
+    遍历时删除写入中途崩溃残留的临时文件，否则清理时目录无法变空；
+    链接检测等不持有任务锁的扫描可能与写入同时进行，只删除长时间未修改的临时文件
+    """
+
+    def __init__(self, root: str, parallel: bool = False, workers: int = 8):
+        """
+        :param root: strm存储目录
+        :param parallel: 是否按顶层目录并发扫描
+        :param workers: 并发扫描线程数
+        """
+        self._root = root
+        self._parallel = parallel
+        self._workers = max(1, int(workers or 1))
+        self._lock = threading.Lock()
+        self.files: Set[str] = set()
+        self.dirs: Set[str] = set()
+
+    @staticmethod
+    def __remove_stale_tmp(entry: os.DirEntry):
+        """删除残留的临时文件，只对临时文件额外stat"""
+        try:
+            if time.time() - entry.stat(follow_symlinks=False).st_mtime < STALE_TMP_SECONDS:
+                return
+            os.unlink(entry.path)
+            logger.debug(f"删除残留的临时文件 {entry.path}")
+        except OSError:
+            pass
+
+    @classmethod
+    def __is_tmp(cls, name: str) -> bool:
+        return name.startswith(TMP_PREFIX) and name.endswith(TMP_SUFFIX)
+
+    @classmethod
+    def __walk(cls, top: str) -> Tuple[Set[str], Set[str]]:
+        """
+        遍历目录树，返回（strm文件集合，目录集合），只依赖目录项类型，不额外stat
+        """
+        files, dirs = set(), set()
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            try:
+                with os.scandir(path) as entries:
+                    dirs.add(path)
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.endswith(".strm"):
+                            files.add(entry.path)
+                        elif cls.__is_tmp(entry.name):
+                            cls.__remove_stale_tmp(entry)
+            except OSError as e:
+                logger.debug(f"扫描目录失败 {path}: {str(e)}")
+        return files, dirs
+
+    def scan(self) -> int:
+        """
+        扫描存储目录
+        :return: strm文件数
+        """
+        started = time.monotonic()
+        if not os.path.isdir(self._root):
+            self.files, self.dirs = set(), set()
+            return 0
+        if not self._parallel:
+            self.files, self.dirs = self.__walk(self._root)
+        else:
+            tops: List[str] = []
+            files, dirs = set(), {self._root}
+            with os.scandir(self._root) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        tops.append(entry.path)
+                    elif entry.name.endswith(".strm"):
+                        files.add(entry.path)
+                    elif self.__is_tmp(entry.name):
+                        self.__remove_stale_tmp(entry)
+            with ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="anistrm-run-scan"
+            ) as pool:
+                for sub_files, sub_dirs in pool.map(self.__walk, tops):
+                    files |= sub_files
+                    dirs |= sub_dirs
+            self.files, self.dirs = files, dirs
+        logger.info(
+            f"本地索引扫描完成：{len(self.files)} 个strm文件，"
+            f"{len(self.dirs)} 个目录，耗时 {time.monotonic() - started:.1f} 秒"
+        )
+        return len(self.files)
+
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self.files
+
+    def add(self, file_path: str):
+        with self._lock:
+            self.files.add(file_path)
+            self.dirs.add(os.path.dirname(file_path))
@@ -0,0 +1,76 @@
+import posixpath
+from typing import Iterable, List, Tuple
+
+from app.log import logger
+from app.utils.http import RequestUtils
+
+
+def parse_path_map(value: str) -> List[Tuple[str, str]]:
+    """
+    解析路径映射，每行或逗号分隔一条，格式为 本地路径:媒体服务器路径
+    长前缀优先匹配
+    """
+    mappings = []
+    for item in (value or "").replace("\n", ",").split(","):
+        local, sep, remote = item.strip().partition(":")
+        if sep and local.strip() and remote.strip():
+            mappings.append((local.strip().rstrip("/"), remote.strip().rstrip("/")))
+    return sorted(mappings, key=lambda m: len(m[0]), reverse=True)
+
+
+class LibraryRefresher:
+    """
+    Emby / Jellyfin 按路径刷新媒体库
+    通过 /Library/Media/Updated 通知媒体服务器指定目录有新文件，
+    服务器只扫描这些目录，不触发整个媒体库的扫描；多个目录合并在一个请求中提交
+    """
+
+    # 单个请求最多提交的目录数
+    _batch_size = 100
+
+    def __init__(self, host: str, apikey: str, path_map: str = "", timeout: int = 20):
+        """
+        :param host: 媒体服务器地址，如 http://127.0.0.1:8096
+        :param apikey: API密钥
+        :param path_map: 路径映射，strm存储路径与媒体服务器中看到的路径不同时配置
+        """
+        self._host = host.strip().rstrip("/")
+        self._apikey = apikey.strip()
+        self._path_map = parse_path_map(path_map)
+        self._timeout = timeout
+
+    def map_path(self, path: str) -> str:
+        """本地路径转换为媒体服务器路径"""
+        for local, remote in self._path_map:
+            if path == local or path.startswith(local + "/"):
+                return remote + path[len(local) :]
+        return path
+
+    def refresh(self, paths: Iterable[str]) -> List[str]:
+        """
+        按路径刷新
+        :param paths: 本地目录
+        :return: 刷新失败的本地目录，可稍后重试
+        """
+        paths = sorted(set(paths))
+        failed = []
+        for start in range(0, len(paths), self._batch_size):
+            batch = paths[start : start + self._batch_size]
+            payload = {
+                "Updates": [
+                    {"Path": posixpath.normpath(self.map_path(path)), "UpdateType": "Created"}
+                    for path in batch
+                ]
+            }
+            rep = RequestUtils(
+                headers={"X-Emby-Token": self._apikey, "Content-Type": "application/json"},
+                timeout=self._timeout,
+            ).post(f"{self._host}/Library/Media/Updated", json=payload)
+            if rep is not None and rep.status_code in (200, 204):
+                logger.info(f"已通知媒体服务器刷新 {len(batch)} 个目录")
+                continue
+            logger.warning(
+                f'通知媒体服务器刷新失败: HTTP {rep.status_code if rep is not None else "无响应"}'
+            )
+            failed.extend(batch)
+        return failed
@@ -0,0 +1,130 @@
+import bisect
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 运行模式及页面显示名称
+RUN_MODES = {"full": "全量", "current": "当前季度", "poll": "放送轮询", "refresh": "指定刷新"}
+
+
+class LatencyHistogram:
+    """
+    请求耗时直方图
+    按对数分桶计数，内存占用固定，分位数取所在桶的上界
+    """
+
+    # 桶上界（毫秒）：1ms 起按 1.2 倍递增，至约 2 分钟
+    _bounds: List[float] = [round(1.2**i, 1) for i in range(65)]
+
+    def __init__(self):
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, millis: float):
+        self._counts[bisect.bisect_left(self._bounds, millis)] += 1
+        self.count += 1
+        self.total += millis
+        self.max = max(self.max, millis)
+
+    def percentile(self, q: float) -> float:
+        """
+        :param q: 分位，0-100
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(self.count * q / 100)))
+        seen = 0
+        for idx, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                if idx >= len(self._bounds):
+                    break
+                return min(self._bounds[idx], self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "p50": round(self.percentile(50), 1),
+            "p95": round(self.percentile(95), 1),
+            "p99": round(self.percentile(99), 1),
+            "max": round(self.max, 1),
+            "mean": round(self.total / self.count, 1) if self.count else 0.0,
+        }
+
+
+class RunMetrics:
+    """
+    单次运行的指标
+    请求指标由 openani 客户端在每次请求后记录，阶段耗时由插件任务记录
+    """
+
+    def __init__(self, mode: str = None):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.mode = mode
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = LatencyHistogram()
+        # 各阶段耗时（秒）：scan 本地索引、list 目录抓取、write 写入strm
+        self.phases: Dict[str, float] = {}
+        # 各季度抓取耗时（秒）
+        self.seasons: Dict[str, float] = {}
+        self.retries = 0
+        self.hedges = 0
+        # 运行结束时各站点的延迟与健康状态
+        self.endpoints: List[dict] = []
+        self.files = 0
+        self.created = 0
+        self.status = "running"
+        self.elapsed = 0.0
+
+    def record_request(self, seconds: float, status: Optional[int], size: int = 0):
+        """
+        记录一次请求
+        :param status: HTTP状态码，无响应为None
+        :param size: 响应大小（字节）
+        """
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+            if status is None or status >= 400:
+                self.errors += 1
+            self.latency.add(seconds * 1000)
+
+    def add_phase(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_seasons(self, durations: Dict[str, float]):
+        with self._lock:
+            for season, seconds in durations.items():
+                self.seasons[season] = self.seasons.get(season, 0.0) + seconds
+
+    def finish(self, status: str):
+        self.status = status
+        self.elapsed = time.monotonic() - self._started
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "mode": self.mode,
+                "status": self.status,
+                "elapsed": round(self.elapsed, 2),
+                "phases": {k: round(v, 2) for k, v in self.phases.items()},
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "bytes": self.bytes,
+                "files": self.files,
+                "created": self.created,
+                "latency": self.latency.summary(),
+                "seasons": {k: round(v, 2) for k, v in self.seasons.items()},
+                "endpoints": self.endpoints,
+            }
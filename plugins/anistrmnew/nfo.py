@@ -0,0 +1,100 @@
+import os
+import re
+import xml.dom.minidom
+from datetime import datetime
+from typing import Iterable, Optional
+
+from app.log import logger
+from app.utils.dom import DomUtils
+
+from .parser import parse_file_name, season_number
+from .schedule import parse_modified
+
+# 番剧目录的元数据文件名
+TVSHOW_NFO = "tvshow.nfo"
+
+# 季度目录名，如 2024-10
+_SEASON_DIR = re.compile(r"^(\d{4})-(\d{1,2})$")
+
+
+def _to_xml(doc: xml.dom.minidom.Document) -> str:
+    return doc.toprettyxml(indent="  ", encoding="utf-8").decode("utf-8")
+
+
+def episode_nfo(file_name: str, modified: Optional[str] = None) -> Optional[str]:
+    """
+    生成剧集元数据，标题与集数来自抓取时解析的文件名
+    ANi每部番剧的每一季单独成目录，季数取番剧名称中的"第三季"等标注，未标注为1；
+    12.5等总集篇、特别篇放入第0季
+    :param modified: 上游文件修改时间，作为播出日期
+    :return: episodedetails XML，未识别出集数时返回None，交由媒体服务器刮削
+    """
+    parsed = parse_file_name(file_name)
+    if not parsed.episode:
+        return None
+    number = float(parsed.episode)
+    special = not number.is_integer()
+    doc = xml.dom.minidom.Document()
+    root = DomUtils.add_node(doc, doc, "episodedetails")
+    DomUtils.add_node(doc, root, "title", f"第 {parsed.episode} 集")
+    DomUtils.add_node(doc, root, "showtitle", parsed.title)
+    DomUtils.add_node(
+        doc, root, "season", 0 if special else season_number(parsed.title) or 1
+    )
+    DomUtils.add_node(doc, root, "episode", int(number))
+    aired = parse_modified(modified)
+    if aired:
+        DomUtils.add_node(
+            doc, root, "aired", datetime.fromtimestamp(aired).strftime("%Y-%m-%d")
+        )
+    return _to_xml(doc)
+
+
+def tvshow_nfo(anime_name: str, season: Optional[str] = None) -> str:
+    """
+    生成番剧元数据
+    目录列表中没有TMDB、Bangumi等ID，不写入uniqueid，媒体服务器仍需按标题识别番剧
+    :param season: 季度目录，如 2024-10，用于推算首播年份
+    """
+    doc = xml.dom.minidom.Document()
+    root = DomUtils.add_node(doc, doc, "tvshow")
+    DomUtils.add_node(doc, root, "title", anime_name)
+    DomUtils.add_node(doc, root, "originaltitle", anime_name)
+    DomUtils.add_node(doc, root, "genre", "动画")
+    match = _SEASON_DIR.match(season or "")
+    if match:
+        year, month = int(match.group(1)), int(match.group(2))
+        DomUtils.add_node(doc, root, "year", year)
+        DomUtils.add_node(doc, root, "premiered", f"{year:04d}-{month:02d}-01")
+    return _to_xml(doc)
+
+
+def sidecar_path(strm_path: str) -> str:
+    """strm文件对应的剧集元数据文件"""
+    return f"{strm_path[: -len('.strm')]}.nfo"
+
+
+def remove_sidecars(strm_files: Iterable[str]) -> int:
+    """
+    删除已移除strm文件的剧集元数据；目录中只剩番剧元数据时一并删除，使空目录可以清理
+    :return: 删除的文件数
+    """
+    removed = 0
+    dirs = set()
+    for strm_path in strm_files:
+        dirs.add(os.path.dirname(strm_path))
+        try:
+            os.remove(sidecar_path(strm_path))
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除元数据文件失败 {strm_path}: {str(e)}")
+    for dir_path in dirs:
+        try:
+            if os.listdir(dir_path) == [TVSHOW_NFO]:
+                os.remove(os.path.join(dir_path, TVSHOW_NFO))
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,180 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+# 任意方括号标签
+_TAG = re.compile(r"\[([^\]]*)\]")
+# 集数，如 02、12.5、03v2
+_EPISODE = re.compile(r"^\s*(\d+(?:\.\d+)?)(?:[vV](\d+))?\b")
+# 标题归一化时忽略的字符：空白与标点
+_TITLE_NOISE = re.compile(r"[\W_]+", re.UNICODE)
+# 标题中的季数，如 第三季、第2期、Season 2、2nd Season
+_SEASON = re.compile(
+    r"第\s*([0-9一二三四五六七八九十]+)\s*[季期]"
+    r"|\bSeason\s*(\d+)\b"
+    r"|\b(\d+)(?:st|nd|rd|th)\s+Season\b",
+    re.IGNORECASE,
+)
+# 中文数字
+_CHINESE_DIGITS = {c: i for i, c in enumerate("零一二三四五六七八九")}
+# 视频扩展名
+VIDEO_EXTENSIONS = frozenset({"mp4", "mkv", "avi", "ts", "m4v", "webm"})
+# 字幕语言标签
+LANGUAGE_TAGS = frozenset({"CHT", "CHS", "BIG5", "GB", "JPN", "ENG", "简体", "繁體", "简繁"})
+# 片源格式与编码标签，不作为来源
+FORMAT_TAGS = frozenset({"WEB-DL", "WEBRIP", "BDRIP", "HDTV", "AAC AVC", "AAC HEVC", "AVC", "HEVC", "AAC"})
+
+
+class ParsedName(NamedTuple):
+    """
+    ANi文件名解析结果
+    例如：[ANi] 葬送的芙莉蓮 - 02 [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4
+    """
+
+    # 番剧名称：葬送的芙莉蓮
+    title: str
+    # 集数：02，未识别为None
+    episode: Optional[str]
+    # 分辨率：1080P
+    resolution: Optional[str]
+    # 来源：Baha
+    source: Optional[str]
+    # 字幕语言：CHT
+    language: Optional[str]
+    # 集数之后的全部标签
+    tags: Tuple[str, ...]
+    # 扩展名：mp4
+    ext: Optional[str]
+    # 修订版本：03v2 中的 2，未标注为None
+    revision: Optional[str] = None
+
+
+def _is_resolution(tag: str) -> bool:
+    """分辨率标签，如 1080P、2160p"""
+    return len(tag) in (4, 5) and tag[-1] in "pP" and tag[:-1].isdecimal()
+
+
+@lru_cache(maxsize=1024)
+def _parse_tags(
+    tail: str,
+) -> Tuple[Tuple[str, ...], Optional[str], Optional[str], Optional[str]]:
+    """
+    解析集数之后的标签，返回（标签, 分辨率, 来源, 字幕语言）
+    同一发布格式的标签组合在全部文件名中反复出现，单独缓存
+    """
+    tags = tuple(tag.strip() for tag in _TAG.findall(tail)) if "[" in tail else ()
+    resolution = source = language = None
+    for tag in tags:
+        upper = tag.upper()
+        if resolution is None and _is_resolution(tag):
+            resolution = upper
+        elif language is None and (upper in LANGUAGE_TAGS or tag in LANGUAGE_TAGS):
+            language = tag
+        elif source is None and upper not in FORMAT_TAGS:
+            source = tag
+    return tags, resolution, source, language
+
+
+@lru_cache(maxsize=8192)
+def parse_file_name(file_name: str) -> ParsedName:
+    """
+    解析ANi文件名，同一文件名每次运行都会重复出现，结果按文件名缓存
+    去重索引以全部已处理记录预热，文件名数可能超过缓存容量，
+    未命中时以字符串操作拆分，集数之后的标签按标签组合缓存
+    """
+    # 移除开头的标签 [ANi] 等
+    name = file_name
+    if name.startswith("["):
+        end = name.find("]")
+        if end != -1:
+            name = name[end + 1 :].lstrip()
+
+    # 提取 " - " 之前的部分作为番剧名称，之后为集数与标签
+    rest = ""
+    if " - " in name:
+        name, rest = name.split(" - ", 1)
+        name = name.strip()
+        rest = rest.rpartition(" - ")[2]
+
+    # 移除可能的尾部标签
+    title = (_TAG.sub("", name) if "[" in name else name).strip()
+
+    # 如果提取失败，使用原文件名
+    if not title:
+        title = file_name
+
+    _, dot, ext = file_name.rpartition(".")
+    ext = ext.lower() if dot else None
+    if ext not in VIDEO_EXTENSIONS:
+        ext = None
+    episode_match = _EPISODE.match(rest)
+    tags, resolution, source, language = _parse_tags(
+        rest[episode_match.end() :] if episode_match else rest
+    )
+
+    return ParsedName(
+        title,
+        episode_match.group(1) if episode_match else None,
+        resolution,
+        source,
+        language,
+        tags,
+        ext,
+        episode_match.group(2) if episode_match else None,
+    )
+
+
+def extract_anime_name(file_name: str) -> str:
+    """
+    从文件名中提取番剧名称
+    """
+    return parse_file_name(file_name).title
+
+
+@lru_cache(maxsize=8192)
+def normalize_title(title: str) -> str:
+    """
+    标题归一化：全半角统一、忽略大小写、空白与标点，用于跨目录比较番剧名称
+    """
+    return _TITLE_NOISE.sub("", unicodedata.normalize("NFKC", title).casefold())
+
+
+def _chinese_number(text: str) -> Optional[int]:
+    """解析一百以内的中文数字，如 三、十二、二十"""
+    if text.isdecimal():
+        return int(text)
+    tens, sep, ones = text.rpartition("十")
+    if not sep:
+        return _CHINESE_DIGITS.get(text)
+    if len(tens) > 1 or len(ones) > 1:
+        return None
+    return _CHINESE_DIGITS.get(tens, 1) * 10 + _CHINESE_DIGITS.get(ones, 0)
+
+
+@lru_cache(maxsize=1024)
+def season_number(title: str) -> Optional[int]:
+    """
+    从番剧名称中解析季数，如 Re：從零開始的異世界生活 第三季 -> 3
+    :return: 季数，未标注时返回None
+    """
+    match = _SEASON.search(title)
+    if not match:
+        return None
+    if match.group(1):
+        return _chinese_number(match.group(1))
+    return int(match.group(2) or match.group(3))
+
+
+def episode_key(file_name: str) -> Tuple[str, str, str]:
+    """
+    剧集去重键：（归一化标题, 集数, 版本），版本由分辨率、字幕语言、扩展名、来源与修订版本组成
+    未识别出集数时以完整文件名作为集数，只与同名文件重复
+    """
+    parsed = parse_file_name(file_name)
+    return (
+        normalize_title(parsed.title),
+        parsed.episode or file_name,
+        f"{parsed.resolution or ''}|{parsed.language or ''}|{parsed.ext or ''}"
+        f"|{parsed.source or ''}|{parsed.revision or ''}",
+    )
@@ -0,0 +1,178 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.log import logger
+
+from .client import OpenAniClient
+from .ratelimit import AdaptiveRateLimiter
+
+# 探测结果
+ALIVE = "alive"
+DEAD = "dead"
+UNKNOWN = "unknown"
+
+
+class LinkCache:
+    """
+    链接探测结果缓存，存放在插件数据目录下的SQLite数据库中，按TTL过期
+    """
+
+    def __init__(self, db_path: Path, ttl: int = 86400):
+        """
+        :param ttl: 缓存有效期（秒）
+        """
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS link_status ("
+            "url TEXT PRIMARY KEY, status TEXT, checked_at INTEGER)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[str]:
+        """未过期的探测结果"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, checked_at FROM link_status WHERE url = ?", (url,)
+            ).fetchone()
+        if row and time.time() - row[1] < self._ttl:
+            return row[0]
+        return None
+
+    def set_many(self, results: Iterable[Tuple[str, str]]):
+        now = int(time.time())
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO link_status (url, status, checked_at) VALUES (?, ?, ?)",
+                ((url, status, now) for url, status in results),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+
+class LinkProber:
+    """
+    strm链接批量探测
+    使用 Range: bytes=0-0 的流式GET请求，只读取响应头，不下载视频内容；
+    并发探测，结果按TTL缓存，失效链接可移入隔离目录
+    """
+
+    def __init__(
+        self,
+        client: OpenAniClient,
+        cache: Optional[LinkCache] = None,
+        workers: int = 16,
+        rate_limit: float = 20,
+    ):
+        """
+        :param client: openani 请求客户端，复用其连接池
+        :param cache: 探测结果缓存
+        :param workers: 并发探测数
+        :param rate_limit: 探测请求速率（次/秒），与目录抓取的限速分开
+        """
+        self._client = client
+        self._cache = cache
+        self._workers = max(1, int(workers or 1))
+        self._limiter = AdaptiveRateLimiter(rate=rate_limit)
+
+    def probe(self, url: str) -> str:
+        """
+        探测单个链接
+        :return: alive / dead / unknown（网络异常或服务端错误，不作判断）
+        """
+        try:
+            response = self._client.get(
+                url,
+                headers={"Range": "bytes=0-0"},
+                stream=True,
+                allow_redirects=True,
+                timeout=10,
+                limiter=self._limiter,
+            )
+        except Exception as e:
+            logger.debug(f"URL 探测异常: {str(e)[:100]}")
+            return UNKNOWN
+        if response is None:
+            return UNKNOWN
+        try:
+            if response.status_code in (200, 206):
+                return ALIVE
+            if response.status_code in (404, 410):
+                return DEAD
+            return UNKNOWN
+        finally:
+            # 流式响应未读取内容，直接关闭连接
+            response.close()
+
+    def __probe_cached(self, url: str) -> Tuple[str, bool]:
+        if self._cache:
+            status = self._cache.get(url)
+            if status:
+                return status, True
+        return self.probe(url), False
+
+    def probe_files(self, strm_files: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        探测strm文件中的链接
+        :return: {alive/dead/unknown: [strm文件路径]}
+        """
+        started = time.monotonic()
+        entries: List[Tuple[str, str]] = []
+        for file_path in strm_files:
+            try:
+                with open(file_path, "r", encoding="utf-8") as file:
+                    entries.append((file_path, file.read().strip()))
+            except OSError as e:
+                logger.warning(f"读取strm文件失败 {file_path}: {str(e)}")
+
+        # 同一链接只探测一次
+        urls = list({url for _, url in entries if url})
+        statuses: Dict[str, str] = {}
+        fresh: List[Tuple[str, str]] = []
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            for url, (status, cached) in zip(urls, pool.map(self.__probe_cached, urls)):
+                statuses[url] = status
+                if not cached and status != UNKNOWN:
+                    fresh.append((url, status))
+        if self._cache and fresh:
+            self._cache.set_many(fresh)
+
+        result: Dict[str, List[str]] = {ALIVE: [], DEAD: [], UNKNOWN: []}
+        for file_path, url in entries:
+            result[statuses.get(url, UNKNOWN)].append(file_path)
+        logger.info(
+            f"链接探测完成：{len(entries)} 个strm文件，{len(urls)} 个链接，"
+            f"新探测 {len(fresh)} 个，有效 {len(result[ALIVE])}，失效 {len(result[DEAD])}，"
+            f"未知 {len(result[UNKNOWN])}，耗时 {time.monotonic() - started:.1f} 秒"
+        )
+        return result
+
+    @staticmethod
+    def quarantine(files: Iterable[str], root: str, quarantine_dir: Path) -> List[str]:
+        """
+        将失效的strm文件按相对路径移入隔离目录
+        :return: 隔离后的文件路径
+        """
+        moved = []
+        for file_path in files:
+            target = quarantine_dir / os.path.relpath(file_path, root)
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(file_path, target)
+                moved.append(str(target))
+            except OSError as e:
+                logger.warning(f"隔离strm文件失败 {file_path}: {str(e)}")
+        return moved
@@ -0,0 +1,148 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from app.log import logger
+
+
+class RunProfiler:
+    """
+    单次运行的性能剖析
+    用 cProfile 统计函数耗时（网络等待、JSON解析、文件名解析、文件系统调用都会体现在调用栈中），
+    用 tracemalloc 统计内存分配；运行结束后在报告目录写入：
+      <时间>-<任务>.prof  pstats 原始数据，可用 snakeviz 等工具查看
+      <时间>-<任务>.txt   按累计耗时、自身耗时排序的函数与分配最多的代码行
+    只保留最近的若干次报告
+    """
+
+    def __init__(
+        self,
+        report_dir: Path,
+        label: str = "task",
+        keep: int = 10,
+        top: int = 40,
+        thread_prefix: str = "anistrm-run",
+    ):
+        """
+        :param report_dir: 报告目录
+        :param label: 任务名称，用于文件名
+        :param keep: 保留的报告数
+        :param top: 报告中列出的条目数
+        :param thread_prefix: 需要剖析的线程名前缀，只剖析本次运行创建并在运行结束前退出的线程
+        """
+        self._dir = Path(report_dir)
+        self._label = label
+        self._keep = max(1, keep)
+        self._top = top
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._started_at = datetime.now()
+        self._started = 0.0
+        self._tracing = False
+        self._thread_prefix = thread_prefix
+        self._stopped = False
+        self.report_path: Optional[Path] = None
+
+    def __thread_hook(self, *args):
+        """
+        Python 3.12 之前 cProfile 只统计启用它的线程，
+        通过 threading.setprofile 为剖析期间新建的抓取、扫描线程各启用一个剖析器；
+        线程内的剖析器无法从其它线程停止，对冲请求线程池、MoviePilot 的线程等
+        运行结束后仍存活的线程只移除钩子，不启用剖析器
+        """
+        sys.setprofile(None)
+        if self._stopped or not threading.current_thread().name.startswith(
+            self._thread_prefix
+        ):
+            return
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def __enter__(self) -> "RunProfiler":
+        # 已在追踪时（如基准测试）不重复启动，也不在结束时停止
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        if sys.version_info < (3, 12):
+            threading.setprofile(self.__thread_hook)
+        # 3.12 起 cProfile 基于 sys.monitoring，对所有线程生效
+        profile.enable()
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.monotonic() - self._started
+        self._profiles[0].disable()
+        self._stopped = True
+        if sys.version_info < (3, 12):
+            threading.setprofile(None)
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if self._tracing:
+            tracemalloc.stop()
+        try:
+            self.__write(elapsed, current, peak, snapshot)
+            self.__prune()
+        except Exception as e:
+            logger.error(f"写入性能剖析报告失败：{str(e)}")
+        return False
+
+    def __write(self, elapsed: float, current: int, peak: int, snapshot: tracemalloc.Snapshot):
+        self._dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self._started_at.strftime('%Y%m%d-%H%M%S-%f')}-{self._label}"
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            try:
+                stats.add(profile)
+            except (TypeError, ValueError):
+                # 线程未产生任何调用记录
+                continue
+        stats.dump_stats(str(self._dir / f"{stem}.prof"))
+
+        out = io.StringIO()
+        out.write(
+            f"任务：{self._label}\n开始时间：{self._started_at.isoformat(timespec='seconds')}\n"
+            f"耗时：{elapsed:.2f} 秒\n剖析线程数：{len(profiles)}\n"
+            f"内存：当前 {current / 1024 / 1024:.1f} MiB，峰值 {peak / 1024 / 1024:.1f} MiB\n"
+        )
+        stats.stream = out
+        out.write("\n===== 按累计耗时 =====\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self._top)
+        out.write("\n===== 按自身耗时 =====\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self._top)
+        out.write("\n===== 分配最多的代码行 =====\n")
+        snapshot = snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            )
+        )
+        for stat in snapshot.statistics("lineno")[: self._top]:
+            out.write(f"{stat}\n")
+        self.report_path = self._dir / f"{stem}.txt"
+        self.report_path.write_text(out.getvalue(), encoding="utf-8")
+        logger.info(f"性能剖析报告已写入 {self.report_path}")
+
+    def __prune(self):
+        """只保留最近的报告"""
+        stems = sorted({path.stem for path in self._dir.glob("*-*.txt")})
+        for stem in stems[: -self._keep]:
+            for suffix in (".txt", ".prof"):
+                try:
+                    (self._dir / f"{stem}{suffix}").unlink()
+                except FileNotFoundError:
+                    continue
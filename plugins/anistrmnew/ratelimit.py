@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from app.log import logger
+
+# 遵循的Retry-After上限（秒），更长的等待视为请求失败
+MAX_RETRY_AFTER = 60.0
+
+
+class AdaptiveRateLimiter:
+    """
+    自适应令牌桶限速器
+    所有openani请求共用，按观测到的错误率调整速率（加性增、乘性减）：
+    一个统计窗口内无错误时提升速率，错误率过高或遇到限流响应时减半
+    """
+
+    # 统计窗口内的请求数
+    _window = 20
+    # 错误率超过该值时降速
+    _error_threshold = 0.1
+    # 两次降速的最小间隔（秒）
+    _cooldown = 2.0
+
+    def __init__(self, rate: float = 10.0, burst: int = 0):
+        """
+        :param rate: 最大速率（次/秒），0为不限速
+        :param burst: 令牌桶容量，默认与速率一致
+        """
+        self._max_rate = float(rate or 0)
+        self._min_rate = max(0.2, self._max_rate / 10)
+        self._rate = self._max_rate
+        self._burst = float(burst or max(1.0, self._max_rate))
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._last_decrease = 0.0
+        # 限流响应要求的暂停截止时间
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """
+        获取一个令牌，不足时等待
+        """
+        if not self._max_rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(
+                        self._burst, self._tokens + (now - self._updated) * self._rate
+                    )
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def feedback(self, success: bool, throttled: bool = False, retry_after: float = None):
+        """
+        反馈请求结果
+        :param success: 请求是否成功
+        :param throttled: 是否为限流响应（429/503）
+        :param retry_after: 服务端要求的等待时间（秒），最多暂停 MAX_RETRY_AFTER 秒
+        """
+        if not self._max_rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if retry_after:
+                self._paused_until = max(
+                    self._paused_until, now + min(retry_after, MAX_RETRY_AFTER)
+                )
+            if throttled:
+                self.__decrease(now)
+            self._requests += 1
+            if not success:
+                self._errors += 1
+            if self._requests < self._window:
+                return
+            error_rate = self._errors / self._requests
+            self._requests = self._errors = 0
+            if error_rate > self._error_threshold:
+                self.__decrease(now)
+            elif error_rate == 0 and self._rate < self._max_rate:
+                self._rate = min(self._max_rate, self._rate + self._max_rate * 0.1)
+                logger.debug(f"请求速率提升至 {self._rate:.1f} 次/秒")
+
+    def __decrease(self, now: float):
+        if now - self._last_decrease < self._cooldown:
+            return
+        self._last_decrease = now
+        self._rate = max(self._min_rate, self._rate / 2)
+        self._tokens = min(self._tokens, 1.0)
+        logger.info(f"上游限流或错误率过高，请求速率降至 {self._rate:.1f} 次/秒")
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """
+    指数退避（全抖动）
+    """
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析Retry-After响应头，支持秒数与HTTP日期
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
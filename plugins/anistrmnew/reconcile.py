@@ -0,0 +1,59 @@
+import os
+from typing import Iterable, List, Set, Tuple
+
+from app.log import logger
+
+
+def diff_local(
+    expected: Set[str], local: Set[str], managed: Set[str]
+) -> Tuple[List[str], List[str]]:
+    """
+    对比上游列表与本地strm文件，集合运算，耗时与文件数成线性
+    :param expected: 按最新上游列表应存在的strm文件路径
+    :param local: 本地已有的strm文件路径
+    :param managed: 插件创建过的文件名（处理记录）
+    :return: (上游已删除或改名、由插件创建的孤立文件, 不在上游列表中也不在处理记录中的其它文件)
+    """
+    orphans, unmanaged = [], []
+    for file_path in sorted(local - expected):
+        file_name = os.path.basename(file_path)[: -len(".strm")]
+        if file_name in managed:
+            orphans.append(file_path)
+        else:
+            unmanaged.append(file_path)
+    return orphans, unmanaged
+
+
+def remove_files(files: Iterable[str]) -> List[str]:
+    """
+    删除strm文件
+    :return: 已删除的文件
+    """
+    removed = []
+    for file_path in files:
+        try:
+            os.remove(file_path)
+            removed.append(file_path)
+        except OSError as e:
+            logger.warning(f"删除strm文件失败 {file_path}: {str(e)}")
+    return removed
+
+
+def prune_empty_dirs(files: Iterable[str], root: str) -> int:
+    """
+    自下而上删除文件所在的空目录，不超出存储根目录
+    :return: 删除的目录数
+    """
+    root = os.path.abspath(root)
+    pruned = 0
+    for path in sorted({os.path.dirname(f) for f in files}, key=len, reverse=True):
+        path = os.path.abspath(path)
+        while path != root and path.startswith(root + os.sep):
+            try:
+                os.rmdir(path)
+            except OSError:
+                # 非空或已删除
+                break
+            pruned += 1
+            path = os.path.dirname(path)
+    return pruned
@@ -0,0 +1,84 @@
+import sys
+import time
+from datetime import datetime
+from typing import Optional, Tuple, Union
+from urllib.parse import quote
+
+
+def split_ext(file_name: str) -> Tuple[str, str]:
+    """
+    拆分文件名与扩展名，没有扩展名时默认 mp4
+    """
+    if "." in file_name:
+        last_dot_index = file_name.rfind(".")
+        return file_name[:last_dot_index], file_name[last_dot_index + 1 :]
+    return file_name, "mp4"
+
+
+def build_strm_url(
+    base_url: str, season: str, file_name: str, folder: Optional[str] = None
+) -> str:
+    """
+    生成strm文件中的播放地址
+    有二级目录：season/folder/filename.ext?d=true，否则 season/filename.ext?d=true
+    """
+    clean_name, file_ext = split_ext(file_name)
+    encoded_filename = quote(clean_name, safe="")
+    if folder:
+        encoded_folder = quote(folder, safe="")
+        return f"{base_url}/{season}/{encoded_folder}/{encoded_filename}.{file_ext}?d=true"
+    return f"{base_url}/{season}/{encoded_filename}.{file_ext}?d=true"
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class ProcessedRecord:
+    """
+    已处理剧集记录
+    季度、番剧名称、文件夹为大量重复字符串，统一驻留；
+    时间保存为整数时间戳；播放地址可由季度、文件夹、文件名推导，不再保存
+    """
+
+    __slots__ = ("file_name", "season", "anime_name", "folder", "created_at")
+
+    def __init__(
+        self,
+        file_name: str,
+        season: Optional[str] = None,
+        anime_name: Optional[str] = None,
+        folder: Optional[str] = None,
+        created_at: Union[int, float, str, None] = None,
+    ):
+        self.file_name = file_name
+        self.season = _intern(season)
+        self.anime_name = _intern(anime_name)
+        self.folder = _intern(folder)
+        self.created_at = self.to_epoch(created_at)
+
+    @staticmethod
+    def to_epoch(value: Union[int, float, str, None]) -> int:
+        """
+        兼容旧版ISO格式时间
+        """
+        if value is None:
+            return int(time.time())
+        if isinstance(value, str):
+            try:
+                return int(datetime.fromisoformat(value).timestamp())
+            except ValueError:
+                return 0
+        return int(value)
+
+    def strm_url(self, base_url: str) -> str:
+        """
+        按需生成播放地址
+        """
+        return build_strm_url(base_url, self.season, self.file_name, self.folder)
+
+    def as_row(self) -> tuple:
+        return self.file_name, self.season, self.anime_name, self.folder, self.created_at
+
+    def __repr__(self):
+        return f"ProcessedRecord({self.season}/{self.anime_name}/{self.file_name})"
@@ -0,0 +1,196 @@
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 轮询分层
+HOT = "hot"
+WARM = "warm"
+COLD = "cold"
+
+DAY = 86400
+
+
+def parse_modified(value: Optional[str]) -> Optional[int]:
+    """
+    解析openani返回的修改时间，如 2024-10-05T14:32:10.123Z
+    """
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return None
+
+
+def _season_order(season: str) -> Tuple[int, int]:
+    year, _, month = season.partition("-")
+    try:
+        return int(year), int(month)
+    except ValueError:
+        return 0, 0
+
+
+class PollPlanner:
+    """
+    按放送规律安排番剧文件夹的轮询
+    从剧集文件的修改时间学习每部番剧的更新间隔与时间点，预测下一集的上线时间：
+    hot  预计上线窗口内，按最短间隔轮询
+    warm 仍在连载但不在窗口内，按中等间隔轮询，并在窗口开始时唤醒
+    cold 长时间未更新（完结、停更或ANi目录中的旧番），很少轮询
+    超过保留期仍未更新的番剧文件夹移出计划，交由全量抓取处理
+    """
+
+    # 同一次更新中上传的多个文件视为一次放送（秒）
+    _release_gap = 12 * 3600
+    # 无法推算间隔时按周更处理
+    _default_interval = 7 * DAY
+    # 预计上线时间前后的轮询窗口（秒）
+    _window_before = 3600
+    _window_after = 6 * 3600
+    # 超过多少天未更新视为cold
+    _cold_after = 30 * DAY
+    # 超过多少天未更新移出计划
+    _retain = 90 * DAY
+    # 每个番剧文件夹保留的放送时间数
+    _history = 12
+
+    def __init__(
+        self,
+        plan: Optional[Dict[str, dict]] = None,
+        hot_minutes: float = 10,
+        warm_hours: float = 3,
+        cold_hours: float = 168,
+    ):
+        """
+        :param plan: 上次保存的计划，{"folders": {季度/番剧文件夹: {"times", "tier", "next"}}, "roots": {季度: 下次轮询时间}}
+        :param hot_minutes: hot 轮询间隔（分钟）
+        :param warm_hours: warm 轮询间隔（小时）
+        :param cold_hours: cold 轮询间隔（小时）
+        """
+        plan = plan or {}
+        self.plan: Dict[str, dict] = plan.get("folders") or {}
+        # 季度根目录的下次轮询时间，用于发现新番剧文件夹
+        self.roots: Dict[str, int] = plan.get("roots") or {}
+        self._hot = max(60, int(hot_minutes * 60))
+        self._warm = max(self._hot, int(warm_hours * 3600))
+        self._cold = max(self._warm, int(cold_hours * 3600))
+
+    def __len__(self):
+        return len(self.plan)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.plan
+
+    def observe(self, key: str, modified: Iterable[Optional[str]], now: float = None):
+        """
+        记录番剧文件夹中剧集文件的修改时间，并重新安排下次轮询
+        """
+        now = now or time.time()
+        entry = self.plan.setdefault(key, {"times": []})
+        times = set(entry["times"])
+        times.update(t for t in map(parse_modified, modified) if t)
+        entry["times"] = sorted(times)[-self._history * 4 :]
+        self.__schedule(entry, now)
+
+    def polled(self, key: str, now: float = None):
+        """
+        番剧文件夹已轮询，未发现新剧集时调用
+        """
+        entry = self.plan.get(key)
+        if entry is not None:
+            self.__schedule(entry, now or time.time())
+
+    def due(self, now: float = None) -> List[str]:
+        """
+        到期需要轮询的番剧文件夹，最早到期的在前
+        """
+        now = now or time.time()
+        return sorted(
+            (key for key, entry in self.plan.items() if entry.get("next", 0) <= now),
+            key=lambda key: self.plan[key].get("next", 0),
+        )
+
+    def root_due(self, season: str, now: float = None) -> bool:
+        """
+        季度根目录是否需要重新列出
+        """
+        return self.roots.get(season, 0) <= (now or time.time())
+
+    def root_polled(self, season: str, now: float = None):
+        """
+        季度根目录已列出，按 warm 间隔再次检查，只保留最近的季度
+        """
+        self.roots[season] = int((now or time.time()) + self._warm)
+        for stale in sorted(self.roots, key=_season_order)[:-4]:
+            del self.roots[stale]
+
+    def prune(self, now: float = None) -> List[str]:
+        """
+        移出长时间未更新的番剧文件夹，正在轮询根目录的季度除外
+        """
+        now = now or time.time()
+        stale = [
+            key
+            for key, entry in self.plan.items()
+            if entry["times"]
+            and now - entry["times"][-1] > self._retain
+            and key.split("/", 1)[0] not in self.roots
+        ]
+        for key in stale:
+            del self.plan[key]
+        return stale
+
+    def tiers(self) -> Dict[str, int]:
+        counts = {HOT: 0, WARM: 0, COLD: 0}
+        for entry in self.plan.values():
+            counts[entry.get("tier", COLD)] += 1
+        return counts
+
+    def releases(self, times: List[int]) -> List[int]:
+        """
+        合并同一次更新中上传的文件，返回每次放送的时间
+        """
+        releases: List[int] = []
+        for t in times:
+            if releases and t - releases[-1] < self._release_gap:
+                continue
+            releases.append(t)
+        return releases[-self._history :]
+
+    def predict(self, times: List[int], now: float) -> Tuple[str, Optional[int]]:
+        """
+        :return: (分层, 预计下一次放送时间)
+        """
+        releases = self.releases(times)
+        if not releases:
+            # 尚无剧集的新番
+            return WARM, None
+        if now - releases[-1] > self._cold_after:
+            return COLD, None
+        gaps = sorted(b - a for a, b in zip(releases, releases[1:]))
+        interval = gaps[len(gaps) // 2] if gaps else self._default_interval
+        interval = min(max(interval, DAY), 31 * DAY)
+        expected = releases[-1] + interval
+        # 延期或跳过的集数，顺延到下一个周期
+        while expected + self._window_after < now:
+            expected += interval
+        if expected - self._window_before <= now:
+            return HOT, expected
+        return WARM, expected
+
+    def __schedule(self, entry: dict, now: float):
+        tier, expected = self.predict(entry["times"], now)
+        if tier == HOT:
+            delay = self._hot
+        elif tier == WARM and expected:
+            # 在预计上线窗口开始时唤醒
+            delay = min(self._warm, max(self._hot, expected - self._window_before - now))
+        elif tier == WARM:
+            delay = self._warm
+        else:
+            delay = self._cold
+        entry["tier"] = tier
+        entry["next"] = int(now + delay)
+
+    def to_dict(self) -> dict:
+        return {"folders": self.plan, "roots": self.roots}
@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+from app.log import logger
+
+from .records import ProcessedRecord
+
+
+class ProcessedStore:
+    """
+    已处理剧集记录，存放在插件数据目录下的SQLite数据库中
+    按文件名主键查询，季度、番剧名称建立索引，写入批量提交
+    播放地址由记录按需生成，不再保存
+    """
+
+    # 累计多少条写入后自动提交
+    _commit_every = 500
+
+    def __init__(self, db_path: Path):
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS processed (
+                file_name TEXT PRIMARY KEY,
+                season TEXT,
+                anime_name TEXT,
+                folder TEXT,
+                created_at INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_processed_season ON processed (season);
+            CREATE INDEX IF NOT EXISTS idx_processed_anime ON processed (anime_name);
+            """
+        )
+        self._conn.commit()
+
+    def __contains__(self, file_name: str) -> bool:
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "SELECT 1 FROM processed WHERE file_name = ?", (file_name,)
+                ).fetchone()
+                is not None
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+
+    def records(self, season: str = None) -> Iterator[ProcessedRecord]:
+        """遍历记录，可按季度过滤"""
+        sql = "SELECT file_name, season, anime_name, folder, created_at FROM processed"
+        params = ()
+        if season:
+            sql += " WHERE season = ?"
+            params = (season,)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield ProcessedRecord(*row)
+
+    def upsert(self, record: ProcessedRecord):
+        """新增或更新单条记录"""
+        self.upsert_many([record])
+
+    def upsert_many(self, records: Iterable[ProcessedRecord]):
+        """批量新增或更新"""
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT INTO processed (file_name, season, anime_name, folder, created_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(file_name) DO UPDATE SET "
+                "season = excluded.season, anime_name = excluded.anime_name, "
+                "folder = excluded.folder, created_at = excluded.created_at",
+                (record.as_row() for record in records),
+            )
+            self._pending += cursor.rowcount
+            if self._pending >= self._commit_every:
+                self.commit()
+
+    def delete(self, file_names: Iterable[str]):
+        """批量删除记录"""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM processed WHERE file_name = ?",
+                ((name,) for name in file_names),
+            )
+            self.commit()
+
+    def by_season(self, season: str) -> List[str]:
+        """查询季度下所有文件名"""
+        with self._lock:
+            return [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT file_name FROM processed WHERE season = ?", (season,)
+                )
+            ]
+
+    def seasons(self) -> List[str]:
+        """有记录的季度"""
+        with self._lock:
+            return [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT season FROM processed WHERE season IS NOT NULL"
+                )
+            ]
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def migrate(self, processed_files: dict) -> int:
+        """
+        从旧版插件配置中的processed_files迁移
+        :return: 迁移条数
+        """
+        if not processed_files:
+            return 0
+        self.upsert_many(
+            ProcessedRecord(
+                file_name,
+                season=record.get("season"),
+                anime_name=record.get("anime_name"),
+                folder=record.get("folder"),
+                created_at=record.get("created_at"),
+            )
+            for file_name, record in processed_files.items()
+            if isinstance(record, dict)
+        )
+        self.commit()
+        logger.info(f"已将 {len(processed_files)} 条处理记录迁移至本地数据库")
+        return len(processed_files)
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import threading
+from typing import Iterable, Set
+
+from app.log import logger
+
+# 写入时使用的临时文件名前缀与后缀，崩溃残留的临时文件在本地索引扫描时清理
+TMP_PREFIX = ".anistrm-"
+TMP_SUFFIX = ".tmp"
+
+
+class StrmWriter:
+    """
+    strm文件写入器
+    先写入同目录临时文件再原子重命名，中途崩溃不会留下截断的strm；
+    单次运行内记住已创建的目录，避免重复makedirs；
+    开启落盘时文件写入后fsync，目录的fsync在flush时按目录批量执行
+    """
+
+    def __init__(self, fsync: bool = False):
+        """
+        :param fsync: 是否确保写入落盘
+        """
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._made_dirs: Set[str] = set()
+        self._dirty_dirs: Set[str] = set()
+
+    def known_dirs(self, dirs: Iterable[str]):
+        """
+        登记已存在的目录，如本地索引扫描得到的目录
+        """
+        with self._lock:
+            self._made_dirs.update(dirs)
+
+    def ensure_dir(self, dir_path: str):
+        """
+        创建目录，同一目录每次运行只创建一次
+        """
+        if dir_path in self._made_dirs:
+            return
+        os.makedirs(dir_path, exist_ok=True)
+        with self._lock:
+            self._made_dirs.add(dir_path)
+
+    def write(self, dir_path: str, file_path: str, content: str):
+        """
+        原子写入文件，失败时抛出异常且不影响已有文件
+        """
+        self.ensure_dir(dir_path)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=TMP_PREFIX, suffix=TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                # mkstemp创建的文件仅所有者可读，媒体服务器可能以其它用户运行；
+                # 部分网络挂载不支持修改权限，忽略失败
+                try:
+                    os.fchmod(file.fileno(), 0o644)
+                except OSError:
+                    pass
+                file.write(content)
+                if self._fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(tmp_path, file_path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        if self._fsync:
+            with self._lock:
+                self._dirty_dirs.add(dir_path)
+
+    def flush(self):
+        """
+        批量fsync本次写入过的目录，使重命名落盘
+        """
+        with self._lock:
+            dirty_dirs, self._dirty_dirs = self._dirty_dirs, set()
+        for dir_path in dirty_dirs:
+            try:
+                fd = os.open(dir_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                logger.debug(f"目录落盘失败 {dir_path}: {str(e)}")